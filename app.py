@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import os
+import xxhash
 from datetime import datetime
 from io import BytesIO
 
@@ -10,6 +11,92 @@ from modulos.processador_dados import ProcessadorDados
 from modulos.mapeador_categorias import MapeadorCategorias
 from modulos.gerador_excel import GeradorExcel
 
+def _hash_arquivo(arquivo) -> int:
+    """Calcula o hash xxh3 do arquivo enviado, usado como chave de cache do conjunto de dados"""
+    return xxhash.xxh3_64(arquivo.getvalue()).intdigest()
+
+@st.cache_data(show_spinner=False)
+def _ler_excel_cached(chave_arquivo: int, _conteudo: bytes, _manipulador) -> pd.DataFrame:
+    """Lê o Excel enviado, reaproveitando o resultado entre reruns do Streamlit"""
+    return _manipulador.ler_excel(BytesIO(_conteudo))
+
+def _carregar_upload(arquivo, nome: str, manipulador) -> tuple:
+    """
+    Lê o arquivo enviado, reaproveitando o DataFrame já aceito na sessão
+    
+    Quando o hash do conteúdo é igual ao guardado em hash_<nome>, o
+    DataFrame de dados_<nome> é devolvido sem ler o Excel de novo.
+    
+    Args:
+        arquivo: Arquivo retornado pelo st.file_uploader
+        nome: Sufixo das chaves no session_state (ex: 'lancamentos')
+        manipulador: ManipuladorArquivos da sessão, usado na leitura
+        
+    Returns:
+        tuple: (hash do arquivo, DataFrame lido)
+    """
+    chave_arquivo = _hash_arquivo(arquivo)
+    dados_sessao = st.session_state.get(f'dados_{nome}')
+    if dados_sessao is not None and st.session_state.get(f'hash_{nome}') == chave_arquivo:
+        return chave_arquivo, dados_sessao
+    return chave_arquivo, _ler_excel_cached(chave_arquivo, arquivo.getvalue(), manipulador)
+
+@st.cache_data(show_spinner=False)
+def _resumir_categorias(chave_lancamentos: int, _dados_lancamentos: pd.DataFrame) -> tuple:
+    """Conta e amostra os lançamentos de cada categoria em uma única passada"""
+    contagens = _dados_lancamentos['Categoria'].value_counts()
+    amostras = {
+        categoria: grupo.head(5)
+        for categoria, grupo in _dados_lancamentos.groupby('Categoria', sort=False)
+    }
+    return contagens, amostras
+
+@st.cache_data(show_spinner=False)
+def _categorias_inconsistentes_cached(chave_lancamentos: int, chave_categorias: int,
+                                      coluna_lancamentos: str, coluna_plano: str,
+                                      _dados_lancamentos: pd.DataFrame,
+                                      _dados_categorias: pd.DataFrame,
+                                      _mapeador) -> list:
+    """Memoriza a análise de categorias inconsistentes entre reruns"""
+    return _mapeador.encontrar_categorias_inconsistentes(
+        _dados_lancamentos,
+        _dados_categorias,
+        coluna_lancamentos,
+        coluna_plano
+    )
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _gerar_saidas(chave_lancamentos: int, chave_transferencias: int, chave_categorias: int,
+                  itens_mapeamento: tuple, _processador, _dados_lancamentos: pd.DataFrame,
+                  _dados_transferencias: pd.DataFrame, _dados_categorias: pd.DataFrame) -> tuple:
+    """
+    Processa os dados e gera planilhas + ZIP em memória
+    
+    O resultado fica em cache pelos hashes dos arquivos enviados e pelo mapeamento,
+    então os reruns disparados pelos botões de download não refazem a geração.
+    Parâmetros com "_" não entram na chave de cache. Falhas levantam exceção,
+    que o st.cache_data não guarda: o "Tentar Novamente" gera tudo de novo.
+    Os avisos da formatação voltam no resultado e são exibidos por quem chama,
+    fora da função em cache.
+    """
+    dados_processados = _processador.processar_todos_os_dados(
+        _dados_lancamentos,
+        _dados_transferencias,
+        _dados_categorias,
+        dict(itens_mapeamento)
+    )
+    
+    # Gerar planilhas e ZIP em memória (sem salvar no disco)
+    gerador = GeradorExcel()
+    arquivos_memoria, conteudo_zip = gerador.gerar_zip_memoria(dados_processados)
+    return arquivos_memoria, conteudo_zip, tuple(gerador.avisos)
+
+@st.cache_data(show_spinner=False)
+def _categorias_validas_cached(chave_categorias: int, coluna_plano: str,
+                               _dados_categorias: pd.DataFrame, _mapeador) -> list:
+    """Memoriza a lista de categorias válidas do plano de contas entre reruns"""
+    return _mapeador.obter_categorias_validas(_dados_categorias, coluna_plano)
+
 def configurar_pagina():
     """Configura a página do Streamlit"""
     st.set_page_config(
@@ -26,25 +113,22 @@ def configurar_pagina():
     
     st.markdown("---")
 
+# Nomes das etapas exibidos na barra de progresso
+ETAPAS = (
+    "Upload de Lançamentos",
+    "Upload de Transferências",
+    "Upload de Categorias",
+    "Validação de Categorias",
+    "Geração das Planilhas"
+)
+
 def exibir_progresso(etapa_atual):
     """Exibe barra de progresso das etapas"""
-    etapas = [
-        "Upload de Lançamentos",
-        "Upload de Transferências", 
-        "Upload de Categorias",
-        "Validação de Categorias",
-        "Geração das Planilhas"
-    ]
-    
-    progresso = (etapa_atual / len(etapas)) * 100
-    st.progress(progresso / 100)
+    st.progress(etapa_atual / len(ETAPAS))
     
     # Mostrar etapas
-    col1, col2, col3, col4, col5 = st.columns(5)
-    colunas = [col1, col2, col3, col4, col5]
-    
-    for i, etapa in enumerate(etapas):
-        with colunas[i]:
+    for i, (coluna, etapa) in enumerate(zip(st.columns(len(ETAPAS)), ETAPAS)):
+        with coluna:
             if i < etapa_atual:
                 st.success(f"✅ {etapa}")
             elif i == etapa_atual:
@@ -52,14 +136,28 @@ def exibir_progresso(etapa_atual):
             else:
                 st.write(f"⏳ {etapa}")
 
+def obter_modulos():
+    """
+    Instancia os módulos uma única vez por sessão
+    
+    Os objetos guardam estado do processamento (ex: dados_processados),
+    por isso ficam no session_state e não são compartilhados entre sessões.
+    """
+    if 'modulos' not in st.session_state:
+        st.session_state.modulos = (
+            ManipuladorArquivos(),
+            ProcessadorDados(),
+            MapeadorCategorias()
+        )
+    return st.session_state.modulos
+
 def main():
     """Função principal da aplicação"""
     configurar_pagina()
     
     # Botão para reiniciar processo
     if st.button("🔄 Reiniciar Processo", help="Limpa todos os dados e reinicia"):
-        for key in list(st.session_state.keys()):
-            del st.session_state[key]
+        st.session_state.clear()
         st.rerun()
     
     # Inicializar estado da sessão
@@ -67,10 +165,13 @@ def main():
         st.session_state.etapa_atual = 0
     if 'dados_lancamentos' not in st.session_state:
         st.session_state.dados_lancamentos = None
+        st.session_state.hash_lancamentos = None
     if 'dados_transferencias' not in st.session_state:
         st.session_state.dados_transferencias = None
+        st.session_state.hash_transferencias = None
     if 'dados_categorias' not in st.session_state:
         st.session_state.dados_categorias = None
+        st.session_state.hash_categorias = None
     if 'mapeamento_categorias' not in st.session_state:
         st.session_state.mapeamento_categorias = {}
     
@@ -78,9 +179,7 @@ def main():
     exibir_progresso(st.session_state.etapa_atual)
     
     # Executar etapa atual
-    manipulador = ManipuladorArquivos()
-    processador = ProcessadorDados()
-    mapeador = MapeadorCategorias()
+    manipulador, processador, mapeador = obter_modulos()
     
     if st.session_state.etapa_atual == 0:
         etapa_upload_lancamentos(manipulador)
@@ -106,7 +205,7 @@ def etapa_upload_lancamentos(manipulador):
     
     if arquivo_lancamentos:
         try:
-            dados = manipulador.ler_excel(arquivo_lancamentos)
+            chave_arquivo, dados = _carregar_upload(arquivo_lancamentos, 'lancamentos', manipulador)
             st.success("✅ Arquivo carregado com sucesso!")
             
             # Mostrar preview dos dados
@@ -120,6 +219,7 @@ def etapa_upload_lancamentos(manipulador):
             # Botão para prosseguir
             if st.button("➡️ Prosseguir para Próxima Etapa", type="primary"):
                 st.session_state.dados_lancamentos = dados
+                st.session_state.hash_lancamentos = chave_arquivo
                 st.session_state.etapa_atual = 1
                 st.rerun()
                 
@@ -139,7 +239,7 @@ def etapa_upload_transferencias(manipulador):
     
     if arquivo_transferencias:
         try:
-            dados = manipulador.ler_excel(arquivo_transferencias)
+            chave_arquivo, dados = _carregar_upload(arquivo_transferencias, 'transferencias', manipulador)
             st.success("✅ Arquivo carregado com sucesso!")
             
             # Mostrar preview dos dados
@@ -159,6 +259,7 @@ def etapa_upload_transferencias(manipulador):
             with col2:
                 if st.button("➡️ Prosseguir para Próxima Etapa", type="primary"):
                     st.session_state.dados_transferencias = dados
+                    st.session_state.hash_transferencias = chave_arquivo
                     st.session_state.etapa_atual = 2
                     st.rerun()
                     
@@ -178,7 +279,7 @@ def etapa_upload_categorias(manipulador):
     
     if arquivo_categorias:
         try:
-            dados = manipulador.ler_excel(arquivo_categorias)
+            chave_arquivo, dados = _carregar_upload(arquivo_categorias, 'categorias', manipulador)
             st.success("✅ Arquivo carregado com sucesso!")
             
             # Mostrar preview dos dados
@@ -198,6 +299,7 @@ def etapa_upload_categorias(manipulador):
             with col2:
                 if st.button("➡️ Prosseguir para Validação", type="primary"):
                     st.session_state.dados_categorias = dados
+                    st.session_state.hash_categorias = chave_arquivo
                     st.session_state.etapa_atual = 3
                     st.rerun()
                     
@@ -240,16 +342,29 @@ def etapa_validacao_categorias(mapeador):
         
         st.markdown("---")
         
+        # Contagem e amostra de registros por categoria (calculadas uma única vez)
+        contagens_categorias, amostras_categorias = pd.Series(dtype='int64'), {}
+        categorias_inconsistentes = []
+        opcoes_categorias = None
+        
         # Análise de categorias - usar colunas fixas
         if not erro_coluna:
             try:
+                contagens_categorias, amostras_categorias = _resumir_categorias(
+                    st.session_state.hash_lancamentos,
+                    st.session_state.dados_lancamentos
+                )
+                
                 st.success(f"✅ Analisando: '{coluna_lancamentos_fixa}' vs '{coluna_plano_fixa}'")
                 
-                categorias_inconsistentes = mapeador.encontrar_categorias_inconsistentes(
+                categorias_inconsistentes = _categorias_inconsistentes_cached(
+                    st.session_state.hash_lancamentos,
+                    st.session_state.hash_categorias,
+                    coluna_lancamentos_fixa,
+                    coluna_plano_fixa,
                     st.session_state.dados_lancamentos,
                     st.session_state.dados_categorias,
-                    coluna_lancamentos_fixa,
-                    coluna_plano_fixa
+                    mapeador
                 )
                 
                 if categorias_inconsistentes:
@@ -262,44 +377,20 @@ def etapa_validacao_categorias(mapeador):
                     
                     # Interface de mapeamento
                     st.subheader("🔄 Mapeamento de Categorias")
-                    categorias_validas = mapeador.obter_categorias_validas(
-                        st.session_state.dados_categorias, 
-                        coluna_plano_fixa
+                    categorias_validas = _categorias_validas_cached(
+                        st.session_state.hash_categorias,
+                        coluna_plano_fixa,
+                        st.session_state.dados_categorias,
+                        mapeador
                     )
                     
                     if not categorias_validas:
                         st.error("❌ Não foi possível obter categorias válidas do plano de contas")
                         st.info("💡 Verifique se o arquivo de categorias está correto")
                     else:
-                        for categoria_antiga in categorias_inconsistentes:
-                            st.write(f"**Categoria antiga:** `{categoria_antiga}`")
-                            nova_categoria = st.selectbox(
-                                f"Selecione a nova categoria:",
-                                options=["-- Selecione --"] + categorias_validas,
-                                key=f"mapeamento_{categoria_antiga}",
-                                help=f"Escolha uma categoria válida para substituir '{categoria_antiga}'"
-                            )
-                            if nova_categoria != "-- Selecione --":
-                                # Calcular quantas categorias serão alteradas
-                                count_alteracoes = st.session_state.dados_lancamentos[
-                                    st.session_state.dados_lancamentos['Categoria'] == categoria_antiga
-                                ].shape[0]
-                                
-                                st.session_state.mapeamento_categorias[categoria_antiga] = nova_categoria
-                                st.success(f"✅ **{categoria_antiga}** → **{nova_categoria}**")
-                                st.info(f"📊 **{count_alteracoes} registros** serão alterados")
-                                
-                                # Mostrar amostra dos registros que serão alterados
-                                registros_afetados = st.session_state.dados_lancamentos[
-                                    st.session_state.dados_lancamentos['Categoria'] == categoria_antiga
-                                ].head(5)
-                                
-                                if not registros_afetados.empty:
-                                    st.write("📋 **Amostra dos registros que serão alterados:**")
-                                    colunas_para_mostrar = ['Data', 'Descrição', 'Categoria', 'Valor']
-                                    colunas_existentes = [col for col in colunas_para_mostrar if col in registros_afetados.columns]
-                                    st.dataframe(registros_afetados[colunas_existentes], use_container_width=True)
-                            st.markdown("---")
+                        # Opções montadas uma única vez para todos os selectbox
+                        opcoes_categorias = ("-- Selecione --", *categorias_validas)
+                        
                 else:
                     st.success("✅ Todas as categorias estão consistentes!")
                     
@@ -309,60 +400,94 @@ def etapa_validacao_categorias(mapeador):
         else:
             st.warning("⚠️ Corrija os erros de coluna para continuar")
         
-        # Botões de navegação
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("⬅️ Voltar"):
-                st.session_state.etapa_atual = 2
-                st.rerun()
-        with col2:
-            # Verificar se o mapeamento está completo antes de prosseguir
-            categorias_pendentes = []
-            if not erro_coluna:
-                try:
-                    categorias_inconsistentes = mapeador.encontrar_categorias_inconsistentes(
-                        st.session_state.dados_lancamentos,
-                        st.session_state.dados_categorias,
-                        coluna_lancamentos_fixa,
-                        coluna_plano_fixa
-                    )
-                    categorias_pendentes = [cat for cat in categorias_inconsistentes 
-                                          if cat not in st.session_state.mapeamento_categorias 
-                                          or not st.session_state.mapeamento_categorias[cat]]
-                except:
-                    categorias_pendentes = []
+        # Seletores de mapeamento e navegação (fragmento isolado)
+        _fragmento_mapeamento(
+            erro_coluna,
+            categorias_inconsistentes,
+            opcoes_categorias,
+            contagens_categorias,
+            amostras_categorias
+        )
+
+@st.fragment
+def _fragmento_mapeamento(erro_coluna: bool, categorias_inconsistentes: list, opcoes_categorias,
+                          contagens_categorias: pd.Series, amostras_categorias: dict):
+    """
+    Seletores de mapeamento e navegação da etapa de validação
+    
+    Roda como fragmento: trocar um selectbox reexecuta só este trecho, sem
+    refazer o cabeçalho, a validação de colunas e a análise de categorias.
+    Os botões chamam st.rerun(), que reexecuta o app inteiro.
+    """
+    if opcoes_categorias:
+        for categoria_antiga in categorias_inconsistentes:
+            st.write(f"**Categoria antiga:** `{categoria_antiga}`")
+            nova_categoria = st.selectbox(
+                f"Selecione a nova categoria:",
+                options=opcoes_categorias,
+                key=f"mapeamento_{categoria_antiga}",
+                help=f"Escolha uma categoria válida para substituir '{categoria_antiga}'"
+            )
+            if nova_categoria != "-- Selecione --":
+                # Calcular quantas categorias serão alteradas
+                count_alteracoes = contagens_categorias.get(categoria_antiga, 0)
+                
+                st.session_state.mapeamento_categorias[categoria_antiga] = nova_categoria
+                st.success(f"✅ **{categoria_antiga}** → **{nova_categoria}**")
+                st.info(f"📊 **{count_alteracoes} registros** serão alterados")
+                
+                # Mostrar amostra dos registros que serão alterados
+                registros_afetados = amostras_categorias.get(categoria_antiga)
+                
+                if registros_afetados is not None and not registros_afetados.empty:
+                    st.write("📋 **Amostra dos registros que serão alterados:**")
+                    colunas_para_mostrar = ['Data', 'Descrição', 'Categoria', 'Valor']
+                    colunas_existentes = [col for col in colunas_para_mostrar if col in registros_afetados.columns]
+                    st.dataframe(registros_afetados[colunas_existentes], width="stretch")
+            st.markdown("---")
+    
+    # Botões de navegação
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("⬅️ Voltar"):
+            st.session_state.etapa_atual = 2
+            st.rerun()
+    with col2:
+        # Verificar se o mapeamento está completo antes de prosseguir
+        categorias_pendentes = []
+        if not erro_coluna:
+            # Reaproveita a análise feita acima; sem inconsistências não há pendências
+            if categorias_inconsistentes:
+                categorias_pendentes = [cat for cat in categorias_inconsistentes 
+                                      if cat not in st.session_state.mapeamento_categorias 
+                                      or not st.session_state.mapeamento_categorias[cat]]
+        else:
+            st.warning("⚠️ Corrija os erros de coluna para verificar o mapeamento")
+        
+        if categorias_pendentes:
+            st.warning(f"⚠️ {len(categorias_pendentes)} categorias ainda precisam ser mapeadas")
+            st.button("➡️ Gerar Planilhas", disabled=True, help="Complete o mapeamento de categorias primeiro")
+        else:
+            # Mostrar mapeamento atual para confirmação
+            if st.session_state.mapeamento_categorias:
+                # Calcular total de registros afetados (uma única operação vetorizada)
+                total_registros_afetados = int(contagens_categorias.reindex(
+                    list(st.session_state.mapeamento_categorias), fill_value=0
+                ).sum())
+                
+                st.success("✅ Mapeamento de categorias definido:")
+                st.info(f"🔢 **Total de {total_registros_afetados} registros** serão alterados")
+                
+                with st.expander("📋 Ver detalhes do mapeamento", expanded=True):
+                    for antiga, nova in st.session_state.mapeamento_categorias.items():
+                        count = contagens_categorias.get(antiga, 0)
+                        st.write(f"• **{antiga}** → **{nova}** ({count} registros)")
             else:
-                st.warning("⚠️ Corrija os erros de coluna para verificar o mapeamento")
+                st.info("ℹ️ Nenhum mapeamento de categoria necessário")
             
-            if categorias_pendentes:
-                st.warning(f"⚠️ {len(categorias_pendentes)} categorias ainda precisam ser mapeadas")
-                st.button("➡️ Gerar Planilhas", disabled=True, help="Complete o mapeamento de categorias primeiro")
-            else:
-                # Mostrar mapeamento atual para confirmação
-                if st.session_state.mapeamento_categorias:
-                    # Calcular total de registros afetados
-                    total_registros_afetados = 0
-                    for categoria_antiga in st.session_state.mapeamento_categorias.keys():
-                        count = st.session_state.dados_lancamentos[
-                            st.session_state.dados_lancamentos['Categoria'] == categoria_antiga
-                        ].shape[0]
-                        total_registros_afetados += count
-                    
-                    st.success("✅ Mapeamento de categorias definido:")
-                    st.info(f"🔢 **Total de {total_registros_afetados} registros** serão alterados")
-                    
-                    with st.expander("📋 Ver detalhes do mapeamento", expanded=True):
-                        for antiga, nova in st.session_state.mapeamento_categorias.items():
-                            count = st.session_state.dados_lancamentos[
-                                st.session_state.dados_lancamentos['Categoria'] == antiga
-                            ].shape[0]
-                            st.write(f"• **{antiga}** → **{nova}** ({count} registros)")
-                else:
-                    st.info("ℹ️ Nenhum mapeamento de categoria necessário")
-                
-                if st.button("➡️ Gerar Planilhas", type="primary"):
-                    st.session_state.etapa_atual = 4
-                    st.rerun()
+            if st.button("➡️ Gerar Planilhas", type="primary"):
+                st.session_state.etapa_atual = 4
+                st.rerun()
 
 def etapa_geracao_planilhas(processador):
     """Etapa 5: Geração das planilhas finais"""
@@ -371,17 +496,20 @@ def etapa_geracao_planilhas(processador):
     
     # Aviso importante sobre arquivos abertos
     try:
-        # Processar dados
-        dados_processados = processador.processar_todos_os_dados(
+        # Processar dados e gerar planilhas (em cache entre reruns)
+        arquivos_memoria, conteudo_zip, avisos_geracao = _gerar_saidas(
+            st.session_state.hash_lancamentos,
+            st.session_state.hash_transferencias,
+            st.session_state.hash_categorias,
+            tuple(sorted(st.session_state.mapeamento_categorias.items())),
+            processador,
             st.session_state.dados_lancamentos,
             st.session_state.dados_transferencias,
-            st.session_state.dados_categorias,
-            st.session_state.mapeamento_categorias
+            st.session_state.dados_categorias
         )
         
-        # Gerar planilhas em memória (sem salvar no disco)
-        gerador = GeradorExcel()
-        arquivos_memoria = gerador.gerar_planilhas_memoria(dados_processados)
+        for aviso in avisos_geracao:
+            st.warning(aviso)
         
         if arquivos_memoria:
             st.success(f"✅ {len(arquivos_memoria)} planilhas geradas com sucesso!")
@@ -392,21 +520,12 @@ def etapa_geracao_planilhas(processador):
                 tamanho = len(conteudo) / 1024  # KB
                 st.write(f"{i}. **{nome}** ({tamanho:.1f} KB)")
             
-            # Criar ZIP em memória para download
-            import zipfile
-            import io
-            
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for nome_arquivo, conteudo in arquivos_memoria.items():
-                    zipf.writestr(nome_arquivo, conteudo)
-            
             nome_zip = f"planilhas_vyco_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
             
-            # Botão de download do ZIP
+            # Botão de download do ZIP (bytes só são enviados ao clicar)
             st.download_button(
                 label="📥 Baixar Todas as Planilhas (ZIP)",
-                data=zip_buffer.getvalue(),
+                data=lambda: conteudo_zip,
                 file_name=nome_zip,
                 mime="application/zip",
                 type="primary"
@@ -420,7 +539,7 @@ def etapa_geracao_planilhas(processador):
                 with col1 if i % 2 == 0 else col2:
                     st.download_button(
                         label=f"📝 {nome_arquivo.replace('.xlsx', '')}",
-                        data=conteudo,
+                        data=lambda conteudo=conteudo: conteudo,
                         file_name=nome_arquivo,
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                     )
@@ -432,8 +551,7 @@ def etapa_geracao_planilhas(processador):
         st.write("---")
         if st.button("🔄 Fazer Nova Conversão", type="secondary"):
             # Limpar estado da sessão
-            for key in list(st.session_state.keys()):
-                del st.session_state[key]
+            st.session_state.clear()
             st.rerun()
             
     except Exception as e:
@@ -37,17 +37,18 @@ COLUNAS_ESPERADAS = {
 }
 
 # Configurações de Mapeamento de Colunas (V1 para Vyco)
-MAPEAMENTO_COLUNAS_V1 = {
-    'data': ['data', 'dt_lancamento', 'data_lancamento', 'dt_movimento'],
-    'descricao': ['descricao', 'historico', 'observacao', 'descr'],
-    'valor': ['valor', 'vlr_lancamento', 'montante', 'vlr'],
-    'categoria': ['categoria', 'plano_conta', 'conta', 'classificacao'],
-    'conta_corrente': ['conta_corrente', 'banco', 'conta_banco', 'cc_banco'],
-    'contato': ['contato', 'cliente', 'fornecedor', 'pessoa'],
-    'centro_custo': ['centro_custo', 'cc', 'setor', 'departamento'],
-    'conta_origem': ['conta_origem', 'de', 'origem', 'conta_saida'],
-    'conta_destino': ['conta_destino', 'para', 'destino', 'conta_entrada']
-}
+# Conjuntos imutáveis: busca de nome de coluna em O(1)
+MAPEAMENTO_COLUNAS_V1 = {chave: frozenset(nomes) for chave, nomes in {
+    'data': ('data', 'dt_lancamento', 'data_lancamento', 'dt_movimento'),
+    'descricao': ('descricao', 'historico', 'observacao', 'descr'),
+    'valor': ('valor', 'vlr_lancamento', 'montante', 'vlr'),
+    'categoria': ('categoria', 'plano_conta', 'conta', 'classificacao'),
+    'conta_corrente': ('conta_corrente', 'banco', 'conta_banco', 'cc_banco'),
+    'contato': ('contato', 'cliente', 'fornecedor', 'pessoa'),
+    'centro_custo': ('centro_custo', 'cc', 'setor', 'departamento'),
+    'conta_origem': ('conta_origem', 'de', 'origem', 'conta_saida'),
+    'conta_destino': ('conta_destino', 'para', 'destino', 'conta_entrada')
+}.items()}
 
 # Configurações de Validação
 EXTENSOES_SUPORTADAS = ['.xlsx', '.xls']
@@ -1,17 +1,107 @@
 import pandas as pd
+import numpy as np
 import os
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Tuple
 import streamlit as st
 import io
+from pathlib import Path
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+import openpyxl
+import xlsxwriter
+from xlsxwriter.exceptions import FileCreateError
+
+@lru_cache(maxsize=16)
+def _carregar_colunas_modelo(caminho_modelo: str, data_modificacao: float) -> tuple:
+    """
+    Lê apenas o cabeçalho de um modelo Vyco (nrows=0), com cache por arquivo
+    
+    A data de modificação faz parte da chave, então um modelo alterado
+    é lido de novo.
+    
+    Args:
+        caminho_modelo: Caminho do arquivo modelo
+        data_modificacao: os.path.getmtime do arquivo
+        
+    Returns:
+        tuple: Colunas do modelo
+    """
+    try:
+        return tuple(pd.read_excel(caminho_modelo, nrows=0, engine='calamine').columns)
+    except ImportError:
+        # python-calamine não instalado: openpyxl somente leitura, só a 1ª linha
+        workbook = openpyxl.load_workbook(caminho_modelo, read_only=True, data_only=True)
+        try:
+            cabecalho = list(next(
+                workbook.active.iter_rows(min_row=1, max_row=1, values_only=True), ()
+            ))
+        finally:
+            workbook.close()
+        
+        # Células vazias no fim da linha não são colunas (como no read_excel)
+        while cabecalho and cabecalho[-1] is None:
+            cabecalho.pop()
+        return tuple(
+            f'Unnamed: {i}' if nome is None else nome
+            for i, nome in enumerate(cabecalho)
+        )
 
 class GeradorExcel:
     """Classe responsável por gerar os arquivos Excel no formato Vyco"""
     
+    # Tipo de dado -> arquivo Vyco gerado (também é o nome do modelo)
+    MAPEAMENTO_ARQUIVOS = {
+        'categorias': 'Cadastros - Categorias.xlsx',
+        'centros_custo': 'Cadastros - Centros de Custo.xlsx',
+        'contas_correntes': 'Cadastros - Contas Corrente.xlsx',
+        'contatos': 'Cadastros - Contatos.xlsx',
+        'lancamentos': 'Financeiro - Lançamentos.xlsx',
+        'transferencias': 'Financeiro - Transferências.xlsx'
+    }
+    
+    # Tipo de dado -> arquivo de instruções de preenchimento
+    MAPEAMENTO_INSTRUCOES = {
+        'categorias': 'Cadastros - Categorias.txt',
+        'centros_custo': 'Cadastros - Centros de Custo.txt',
+        'contas_correntes': 'Cadastros - Contas Corrente.txt',
+        'contatos': 'Cadastros - Contatos.txt',
+        'lancamentos': 'Financeiro - Lançamentos.txt',
+        'transferencias': 'Financeiro - Transferências.txt'
+    }
+    
     def __init__(self):
         self.diretorio_modelos = "modelos_vyco"
         self.diretorio_preenchimento = "preenchimento_vyco"
         self.arquivos_gerados = []
+        # Mensagens das threads de geração, exibidas depois pela thread principal
+        self.avisos = []
+        self.erros = []
+        self.atualizar_cache_modelos()
+        
+        # Tipo de planilha -> formatador (métodos já vinculados)
+        self.formatadores = {
+            'categorias': self._formatar_categorias,
+            'centros_custo': self._formatar_centros_custo,
+            'contas_correntes': self._formatar_contas_correntes,
+            'contatos': self._formatar_contatos,
+            'lancamentos': self._formatar_lancamentos,
+            'transferencias': self._formatar_transferencias,
+        }
+    
+    def atualizar_cache_modelos(self) -> None:
+        """
+        Relê a lista de modelos disponíveis no diretório de modelos
+        
+        Feito com um único os.scandir; chamar de novo se modelos forem
+        adicionados ou removidos com o aplicativo em execução.
+        """
+        try:
+            with os.scandir(self.diretorio_modelos) as entradas:
+                self.modelos_existentes = {entrada.name for entrada in entradas if entrada.is_file()}
+        except FileNotFoundError:
+            self.modelos_existentes = set()
     
     def gerar_todas_planilhas(self, dados_processados: Dict[str, pd.DataFrame], 
                              diretorio_saida: str) -> List[str]:
@@ -30,32 +120,26 @@ class GeradorExcel:
             os.makedirs(diretorio_saida, exist_ok=True)
             
             self.arquivos_gerados = []
-            
-            # Mapear dados para arquivos
-            mapeamento_arquivos = {
-                'categorias': 'Cadastros - Categorias.xlsx',
-                'centros_custo': 'Cadastros - Centros de Custo.xlsx',
-                'contas_correntes': 'Cadastros - Contas Corrente.xlsx',
-                'contatos': 'Cadastros - Contatos.xlsx',
-                'lancamentos': 'Financeiro - Lançamentos.xlsx',
-                'transferencias': 'Financeiro - Transferências.xlsx'
-            }
-            
-            # Gerar cada planilha
-            for tipo_dado, nome_arquivo in mapeamento_arquivos.items():
-                if tipo_dado in dados_processados:
-                    caminho_arquivo = os.path.join(diretorio_saida, nome_arquivo)
-                    
-                    # Gerar planilha específica
-                    sucesso = self._gerar_planilha_especifica(
-                        tipo_dado, 
-                        dados_processados[tipo_dado], 
-                        caminho_arquivo
-                    )
-                    
-                    if sucesso:
-                        self.arquivos_gerados.append(nome_arquivo)
-                        st.success(f"✅ {nome_arquivo} gerado com sucesso!")
+            self._limpar_mensagens()
+            
+            # Gerar as planilhas em paralelo (uma por thread)
+            tarefas = [
+                (tipo_dado, dados_processados[tipo_dado], os.path.join(diretorio_saida, nome_arquivo))
+                for tipo_dado, nome_arquivo in self.MAPEAMENTO_ARQUIVOS.items()
+                if tipo_dado in dados_processados
+            ]
+            resultados = self._executar_em_paralelo(self._gerar_planilha_especifica, tarefas)
+            self._exibir_mensagens()
+            
+            for (_, _, caminho_arquivo), sucesso in zip(tarefas, resultados):
+                if sucesso:
+                    self.arquivos_gerados.append(os.path.basename(caminho_arquivo))
+            
+            # Uma única mensagem em vez de um elemento por arquivo
+            if self.arquivos_gerados:
+                st.success("  \n".join(
+                    f"✅ {nome_arquivo} gerado com sucesso!" for nome_arquivo in self.arquivos_gerados
+                ))
             
             return self.arquivos_gerados
             
@@ -75,27 +159,22 @@ class GeradorExcel:
         """
         try:
             arquivos_memoria = {}
+            self._limpar_mensagens()
             
-            # Mapear dados para arquivos
-            mapeamento_arquivos = {
-                'categorias': 'Cadastros - Categorias.xlsx',
-                'centros_custo': 'Cadastros - Centros de Custo.xlsx',
-                'contas_correntes': 'Cadastros - Contas Corrente.xlsx',
-                'contatos': 'Cadastros - Contatos.xlsx',
-                'lancamentos': 'Financeiro - Lançamentos.xlsx',
-                'transferencias': 'Financeiro - Transferências.xlsx'
-            }
-            
-            # Gerar cada planilha em memória
-            for tipo_dado, nome_arquivo in mapeamento_arquivos.items():
+            # Gerar as planilhas em memória em paralelo (uma por thread)
+            nomes_arquivos = []
+            tarefas = []
+            for tipo_dado, nome_arquivo in self.MAPEAMENTO_ARQUIVOS.items():
                 if tipo_dado in dados_processados:
-                    conteudo_bytes = self._gerar_planilha_memoria(
-                        tipo_dado, 
-                        dados_processados[tipo_dado]
-                    )
-                    
-                    if conteudo_bytes:
-                        arquivos_memoria[nome_arquivo] = conteudo_bytes
+                    nomes_arquivos.append(nome_arquivo)
+                    tarefas.append((tipo_dado, dados_processados[tipo_dado]))
+            
+            resultados = self._executar_em_paralelo(self._gerar_planilha_memoria, tarefas)
+            self._exibir_mensagens()
+            
+            for nome_arquivo, conteudo_bytes in zip(nomes_arquivos, resultados):
+                if conteudo_bytes:
+                    arquivos_memoria[nome_arquivo] = conteudo_bytes
             
             return arquivos_memoria
             
@@ -103,6 +182,106 @@ class GeradorExcel:
             st.error(f"Erro ao gerar planilhas em memória: {str(e)}")
             return {}
     
+    def gerar_zip_memoria(self, dados_processados: Dict[str, pd.DataFrame]) -> Tuple[Dict[str, bytes], bytes]:
+        """
+        Gera todas as planilhas em memória junto com o ZIP que as reúne
+        
+        Cada planilha entra no ZIP assim que a sua thread termina, então a
+        escrita do ZIP acontece enquanto as demais ainda estão sendo geradas.
+        Se alguma planilha falhar, levanta exceção em vez de devolver um
+        resultado parcial (que ficaria guardado no cache do Streamlit).
+        Os avisos da formatação ficam em self.avisos, para quem chamou exibir.
+        
+        Args:
+            dados_processados: Dicionário com todos os dados processados
+            
+        Returns:
+            Tuple[Dict[str, bytes], bytes]: Planilhas (na ordem do mapeamento) e conteúdo do ZIP
+        """
+        arquivos_memoria = {}
+        erros = []
+        self._limpar_mensagens()
+        nomes_arquivos = [
+            nome_arquivo for tipo_dado, nome_arquivo in self.MAPEAMENTO_ARQUIVOS.items()
+            if tipo_dado in dados_processados
+        ]
+        if not nomes_arquivos:
+            return {}, b''
+        
+        buffer_zip = io.BytesIO()
+        # xlsx já é um zip comprimido: armazenar sem recomprimir
+        with zipfile.ZipFile(buffer_zip, 'w', zipfile.ZIP_STORED) as arquivo_zip, \
+                self._criar_pool_threads(len(nomes_arquivos)) as executor:
+            futuros = {
+                executor.submit(self._gerar_bytes_planilha, tipo_dado, dados_processados[tipo_dado]): nome_arquivo
+                for tipo_dado, nome_arquivo in self.MAPEAMENTO_ARQUIVOS.items()
+                if tipo_dado in dados_processados
+            }
+            
+            for futuro in as_completed(futuros):
+                # Os erros das threads são reunidos e reportados daqui
+                try:
+                    conteudo_bytes = futuro.result()
+                except Exception as e:
+                    erros.append(f"{futuros[futuro]}: {str(e)}")
+                    continue
+                arquivos_memoria[futuros[futuro]] = conteudo_bytes
+                arquivo_zip.writestr(futuros[futuro], conteudo_bytes)
+        
+        if erros:
+            raise Exception(f"Erro ao gerar planilhas em memória: {'; '.join(erros)}")
+        
+        # Manter a ordem do mapeamento para a listagem e os downloads
+        arquivos_ordenados = {
+            nome_arquivo: arquivos_memoria[nome_arquivo] for nome_arquivo in nomes_arquivos
+        }
+        return arquivos_ordenados, buffer_zip.getvalue()
+    
+    def _executar_em_paralelo(self, funcao, tarefas: List[tuple]) -> list:
+        """
+        Executa a função para cada tupla de argumentos em um pool de threads
+        
+        As threads não chamam st.*: as mensagens ficam em self.avisos e
+        self.erros até a thread principal exibi-las.
+        
+        Args:
+            funcao: Função a executar
+            tarefas: Lista de tuplas de argumentos
+            
+        Returns:
+            list: Resultados na mesma ordem das tarefas
+        """
+        if not tarefas:
+            return []
+        
+        with self._criar_pool_threads(len(tarefas)) as executor:
+            return list(executor.map(lambda argumentos: funcao(*argumentos), tarefas))
+    
+    def _criar_pool_threads(self, total_tarefas: int) -> ThreadPoolExecutor:
+        """
+        Cria o pool de threads da geração
+        
+        Args:
+            total_tarefas: Quantidade de tarefas a executar
+            
+        Returns:
+            ThreadPoolExecutor: Pool com no máximo uma thread por tarefa/CPU
+        """
+        max_threads = min(total_tarefas, os.cpu_count() or 1)
+        return ThreadPoolExecutor(max_workers=max_threads)
+    
+    def _limpar_mensagens(self) -> None:
+        """Descarta as mensagens de uma geração anterior"""
+        self.avisos = []
+        self.erros = []
+    
+    def _exibir_mensagens(self) -> None:
+        """Exibe na thread principal as mensagens reunidas pelas threads"""
+        for erro in self.erros:
+            st.error(erro)
+        for aviso in self.avisos:
+            st.warning(aviso)
+    
     def _gerar_planilha_memoria(self, tipo_planilha: str, dados: pd.DataFrame) -> bytes:
         """
         Gera uma planilha específica em memória
@@ -115,30 +294,40 @@ class GeradorExcel:
             bytes: Conteúdo da planilha em bytes
         """
         try:
-            # Aplicar formatação específica para cada tipo
-            dados_formatados = self._aplicar_formatacao_especifica(tipo_planilha, dados)
-            
-            # Ler modelo se existir para garantir estrutura correta
-            dados_finais = self._aplicar_estrutura_modelo(tipo_planilha, dados_formatados)
-            
-            # Criar buffer em memória
-            buffer = io.BytesIO()
-            
-            # Salvar no buffer
-            with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                dados_finais.to_excel(writer, sheet_name='Dados', index=False)
-                
-                # Aplicar formatação adicional se necessário
-                self._aplicar_formatacao_excel(writer, tipo_planilha)
-            
-            # Obter bytes do buffer
-            buffer.seek(0)
-            return buffer.getvalue()
+            return self._gerar_bytes_planilha(tipo_planilha, dados)
             
         except Exception as e:
-            st.error(f"Erro ao gerar {tipo_planilha} em memória: {str(e)}")
+            self.erros.append(f"Erro ao gerar {tipo_planilha} em memória: {str(e)}")
             return b''
     
+    def _gerar_bytes_planilha(self, tipo_planilha: str, dados: pd.DataFrame) -> bytes:
+        """
+        Formata e escreve uma planilha em memória, deixando os erros subirem
+        
+        Args:
+            tipo_planilha: Tipo da planilha (categorias, lancamentos, etc.)
+            dados: DataFrame com os dados
+            
+        Returns:
+            bytes: Conteúdo da planilha em bytes
+        """
+        # Aplicar formatação específica para cada tipo
+        dados_formatados = self._aplicar_formatacao_especifica(tipo_planilha, dados)
+        
+        # Ler modelo se existir para garantir estrutura correta
+        dados_finais = self._aplicar_estrutura_modelo(tipo_planilha, dados_formatados)
+        
+        # Criar buffer em memória
+        buffer = io.BytesIO()
+        
+        # Salvar no buffer (xlsxwriter em modo de memória constante)
+        self._escrever_planilha_xlsxwriter(buffer, tipo_planilha, dados_finais)
+        
+        # Obter bytes do buffer: no CPython o getvalue() entrega o próprio
+        # buffer interno (sem cópia) quando não há views exportadas; bytes
+        # continuam necessários porque o st.cache_data serializa o retorno
+        return buffer.getvalue()
+    
     def _gerar_planilha_especifica(self, tipo_planilha: str, 
                                   dados: pd.DataFrame, 
                                   caminho_arquivo: str) -> bool:
@@ -162,22 +351,18 @@ class GeradorExcel:
             
             # Salvar arquivo com tratamento de erro
             try:
-                with pd.ExcelWriter(caminho_arquivo, engine='openpyxl') as writer:
-                    dados_finais.to_excel(writer, sheet_name='Dados', index=False)
-                    
-                    # Aplicar formatação adicional se necessário
-                    self._aplicar_formatacao_excel(writer, tipo_planilha)
+                self._escrever_planilha_xlsxwriter(caminho_arquivo, tipo_planilha, dados_finais)
                 
                 return True
-            except PermissionError:
-                st.error(f"❌ Erro de permissão ao salvar {caminho_arquivo}. Feche o arquivo se estiver aberto.")
+            except (PermissionError, FileCreateError):
+                self.erros.append(f"❌ Erro de permissão ao salvar {caminho_arquivo}. Feche o arquivo se estiver aberto.")
                 return False
             except Exception as save_error:
-                st.error(f"❌ Erro ao salvar {caminho_arquivo}: {str(save_error)}")
+                self.erros.append(f"❌ Erro ao salvar {caminho_arquivo}: {str(save_error)}")
                 return False
             
         except Exception as e:
-            st.error(f"Erro ao gerar {tipo_planilha}: {str(e)}")
+            self.erros.append(f"Erro ao gerar {tipo_planilha}: {str(e)}")
             return False
     
     def _aplicar_formatacao_especifica(self, tipo_planilha: str, dados: pd.DataFrame) -> pd.DataFrame:
@@ -191,94 +376,141 @@ class GeradorExcel:
         Returns:
             pd.DataFrame: DataFrame formatado
         """
-        dados_formatados = dados.copy()
+        # Os _formatar_* não alteram o DataFrame recebido; cada um monta um novo
+        formatador = self.formatadores.get(tipo_planilha)
+        if formatador is None:
+            return dados
         
         try:
-            if tipo_planilha == 'categorias':
-                dados_formatados = self._formatar_categorias(dados_formatados)
-            elif tipo_planilha == 'centros_custo':
-                dados_formatados = self._formatar_centros_custo(dados_formatados)
-            elif tipo_planilha == 'contas_correntes':
-                dados_formatados = self._formatar_contas_correntes(dados_formatados)
-            elif tipo_planilha == 'contatos':
-                dados_formatados = self._formatar_contatos(dados_formatados)
-            elif tipo_planilha == 'lancamentos':
-                dados_formatados = self._formatar_lancamentos(dados_formatados)
-            elif tipo_planilha == 'transferencias':
-                dados_formatados = self._formatar_transferencias(dados_formatados)
-            
+            return formatador(dados)
         except Exception as e:
-            st.warning(f"Aviso na formatação de {tipo_planilha}: {str(e)}")
+            self.avisos.append(f"Aviso na formatação de {tipo_planilha}: {str(e)}")
+            return dados
+    
+    def _preparar_escritores_colunas(self, worksheet, dados: pd.DataFrame) -> List[tuple]:
+        """
+        Prepara, para cada coluna, a lista de valores e a função de escrita
         
-        return dados_formatados
+        O tipo é decidido uma única vez pelo dtype da coluna (número, booleano,
+        data ou texto), evitando o despacho genérico do worksheet.write e o
+        pd.isna a cada célula. Valores vazios não são escritos.
+        
+        Args:
+            worksheet: Aba do xlsxwriter
+            dados: DataFrame com os dados finais
+            
+        Returns:
+            List[tuple]: (valores, escrever) de cada coluna, na ordem do DataFrame
+        """
+        def escrever_numero(linha, coluna, valor):
+            if valor == valor:  # NaN é diferente de si mesmo
+                worksheet.write_number(linha, coluna, valor)
+        
+        def escrever_data(linha, coluna, valor):
+            if valor is not pd.NaT:
+                worksheet.write_datetime(linha, coluna, valor)
+        
+        def escrever_texto(linha, coluna, valor):
+            # None e "" ficam como células em branco, como no worksheet.write
+            if valor:
+                worksheet.write_string(linha, coluna, valor)
+        
+        def escrever_generico(linha, coluna, valor):
+            if valor is not None and not pd.isna(valor):
+                worksheet.write(linha, coluna, valor)
+        
+        escritores = []
+        for _, serie in dados.items():
+            # Tipos numpy não têm pd.NA; extensões (Int64, boolean...) vão ao genérico
+            tipo_numpy = serie.dtype.kind if isinstance(serie.dtype, np.dtype) else None
+            if tipo_numpy == 'b':
+                escritores.append((serie.tolist(), worksheet.write_boolean))
+            elif tipo_numpy in ('i', 'u'):
+                escritores.append((serie.tolist(), worksheet.write_number))
+            elif tipo_numpy == 'f':
+                escritores.append((serie.tolist(), escrever_numero))
+            elif tipo_numpy == 'M':
+                escritores.append((serie.astype(object).tolist(), escrever_data))
+            elif pd.api.types.infer_dtype(serie, skipna=True) in ('string', 'empty'):
+                escritores.append((serie.to_numpy(dtype=object, na_value=None).tolist(), escrever_texto))
+            else:
+                escritores.append((serie.to_numpy(dtype=object).tolist(), escrever_generico))
+        
+        return escritores
+    
+    def _calcular_larguras_colunas(self, dados: pd.DataFrame) -> List[int]:
+        """
+        Calcula a largura de cada coluna pelo maior texto (cabeçalho incluído)
+        
+        Cálculo vetorizado: valores vazios contam como 'None' (4 caracteres),
+        soma-se 2 de margem e o resultado é limitado a 50.
+        
+        Args:
+            dados: DataFrame com os dados finais
+            
+        Returns:
+            List[int]: Largura de cada coluna, na ordem do DataFrame
+        """
+        if dados.empty:
+            return [min(len(str(coluna)) + 2, 50) for coluna in dados.columns]
+        
+        comprimentos = (
+            dados.astype(str)
+            .apply(lambda serie: serie.str.len())
+            .where(dados.notna(), 4)
+            .max()
+            .fillna(0)
+            .to_numpy()
+        )
+        cabecalhos = np.array([len(str(coluna)) for coluna in dados.columns])
+        larguras = np.minimum(np.maximum(comprimentos, cabecalhos) + 2, 50)
+        return larguras.astype(int).tolist()
     
     def _formatar_categorias(self, dados: pd.DataFrame) -> pd.DataFrame:
         """
         Formata dados de categorias com estrutura completa do Vyco
         Inclui todas as colunas necessárias e calcula códigos pai
         """
-        dados_formatados = dados.copy()
-        
         # Garantir que temos as colunas básicas
-        if 'Codigo' not in dados_formatados.columns:
+        if 'Codigo' not in dados.columns:
             raise ValueError("Coluna 'Codigo' não encontrada nos dados processados")
         
-        if 'Nome' not in dados_formatados.columns:
+        if 'Nome' not in dados.columns:
             raise ValueError("Coluna 'Nome' não encontrada nos dados processados")
         
-        # Renomear para usar acento conforme modelo Vyco
-        dados_formatados = dados_formatados.rename(columns={'Codigo': 'Código'})
-        
-        # Calcular código pai baseado na hierarquia
-        dados_formatados['Código Pai'] = dados_formatados['Código'].apply(self._calcular_codigo_pai)
-        
-        # Adicionar colunas obrigatórias do Vyco com valores padrão
-        dados_formatados['Competência por Parcela'] = ''  # Vazio por padrão
-        dados_formatados['Desconto %'] = 0.0  # Zero por padrão
-        dados_formatados['Desconto R$'] = 0.0  # Zero por padrão
-        dados_formatados['Dias para vencimento'] = 0  # Zero por padrão
-        dados_formatados['Gera Boleto'] = 'Não'  # Não por padrão
-        dados_formatados['Gera Nota Fiscal'] = 'Não'  # Não por padrão
-        dados_formatados['Gera Recibo'] = 'Não'  # Não por padrão
-        
-        # Definir ordem das colunas conforme modelo Vyco
-        colunas_ordenadas = [
-            'Código', 'Nome', 'Código Pai', 'Competência por Parcela',
-            'Desconto %', 'Desconto R$', 'Dias para vencimento',
-            'Gera Boleto', 'Gera Nota Fiscal', 'Gera Recibo'
-        ]
-        
-        # Reordenar colunas
-        dados_formatados = dados_formatados[colunas_ordenadas]
+        # Montar o DataFrame final já na ordem do modelo Vyco
+        # ('Codigo' renomeada com acento; demais colunas com valores padrão)
+        dados_formatados = pd.DataFrame({
+            'Código': dados['Codigo'],
+            'Nome': dados['Nome'],
+            'Código Pai': self._calcular_codigos_pai(dados['Codigo']),
+            'Competência por Parcela': '',  # Vazio por padrão
+            'Desconto %': 0.0,  # Zero por padrão
+            'Desconto R$': 0.0,  # Zero por padrão
+            'Dias para vencimento': 0,  # Zero por padrão
+            'Gera Boleto': 'Não',  # Não por padrão
+            'Gera Nota Fiscal': 'Não',  # Não por padrão
+            'Gera Recibo': 'Não'  # Não por padrão
+        })
         
         return dados_formatados
     
-    def _calcular_codigo_pai(self, codigo: str) -> str:
+    def _calcular_codigos_pai(self, codigos: pd.Series) -> pd.Series:
         """
-        Calcula o código pai baseado na hierarquia
+        Calcula o código pai de cada código baseado na hierarquia
         Exemplo: '2.1.1.1' -> '2.1.1', '2.1.1' -> '2.1', '2.1' -> '2'
         
         Args:
-            codigo: Código da categoria
+            codigos: Série com os códigos das categorias
             
         Returns:
-            str: Código do pai ou vazio se for nível raiz
+            pd.Series: Código do pai ou vazio se for nível raiz
         """
-        if not isinstance(codigo, str):
-            codigo = str(codigo)
-        
-        codigo = codigo.strip()
-        
-        # Se não contém ponto, é nível raiz (não tem pai)
-        if '.' not in codigo:
-            return ''
+        codigos = codigos.astype(str).str.strip()
         
-        # Dividir por pontos e remover o último nível
-        partes = codigo.split('.')
-        if len(partes) > 1:
-            return '.'.join(partes[:-1])
-        
-        return ''
+        # Remover o último nível; códigos sem ponto são nível raiz (sem pai)
+        pais = codigos.str.rsplit('.', n=1).str[0]
+        return pais.where(codigos.str.contains('.', regex=False), '')
     
     def _formatar_centros_custo(self, dados: pd.DataFrame) -> pd.DataFrame:
         """Formata dados de centros de custo"""
@@ -287,40 +519,24 @@ class GeradorExcel:
     
     def _formatar_contas_correntes(self, dados: pd.DataFrame) -> pd.DataFrame:
         """Formata dados de contas correntes conforme modelo Vyco"""
-        dados_formatados = dados.copy()
-        
-        # Mapear para estrutura do modelo Vyco
-        if 'Codigo' in dados_formatados.columns:
-            dados_formatados = dados_formatados.drop('Codigo', axis=1)
-        
-        # Usar DataInicial calculada ou deixar vazio
-        if 'DataInicial' in dados_formatados.columns:
-            dados_formatados['Data Inicial'] = dados_formatados['DataInicial']
-            dados_formatados = dados_formatados.drop('DataInicial', axis=1)
+        # Usar DataInicial calculada (formatada no padrão brasileiro) ou deixar vazio
+        if 'DataInicial' in dados.columns:
+            data_inicial = self._formatar_datas_brasileiras(dados['DataInicial'])
         else:
-            dados_formatados['Data Inicial'] = ''  # Vazio por padrão
-        
-        # Preservar Data Inicial original formatada para padrão brasileiro
-        if 'Data Inicial' in dados_formatados.columns:
-            dados_formatados['Data Inicial'] = dados_formatados['Data Inicial'].apply(self._formatar_data_brasileira)
-        
-        # Adicionar Valor Inicial
-        dados_formatados['Valor Inicial'] = 0.0  # Zero por padrão
+            data_inicial = ''  # Vazio por padrão
         
-        # Remover coluna 'Ativo' se existir (não está no modelo)
-        if 'Ativo' in dados_formatados.columns:
-            dados_formatados = dados_formatados.drop('Ativo', axis=1)
-        
-        # Definir ordem das colunas conforme modelo
-        colunas_ordenadas = ['Nome', 'Tipo', 'Data Inicial', 'Valor Inicial']
-        dados_formatados = dados_formatados[colunas_ordenadas]
+        # Montar na ordem do modelo ('Codigo' e 'Ativo' não estão no modelo)
+        dados_formatados = pd.DataFrame({
+            'Nome': dados['Nome'],
+            'Tipo': dados['Tipo'],
+            'Data Inicial': data_inicial,
+            'Valor Inicial': 0.0  # Zero por padrão
+        })
         
         return dados_formatados
     
     def _formatar_contatos(self, dados: pd.DataFrame) -> pd.DataFrame:
         """Formata dados de contatos conforme especificação Vyco"""
-        dados_formatados = dados.copy()
-        
         # Garantir que todas as colunas obrigatórias existem conforme documentação
         colunas_esperadas = [
             'Nome', 'Tipo', 'Documento', 'E-mail', 'Enviar e-mail?',
@@ -328,125 +544,146 @@ class GeradorExcel:
             'Contribuinte ICMS?', 'Inscrição Estadual', 'Inscrição Municipal'
         ]
         
-        # Adicionar colunas faltantes se não existirem
-        for coluna in colunas_esperadas:
-            if coluna not in dados_formatados.columns:
-                if coluna == 'Tipo':
-                    dados_formatados[coluna] = 0  # Não Identificado
-                elif coluna in ['Enviar e-mail?', 'Contribuinte ICMS?']:
-                    dados_formatados[coluna] = False  # Não
-                else:
-                    dados_formatados[coluna] = ''  # Vazio
+        # Valores padrão das colunas faltantes
+        valores_padrao = {
+            'Tipo': 0,  # Não Identificado
+            'Enviar e-mail?': False,  # Não
+            'Contribuinte ICMS?': False  # Não
+        }
         
-        # Reordenar colunas conforme especificação
-        dados_formatados = dados_formatados[colunas_esperadas]
+        # Montar de uma vez, na ordem da especificação (demais faltantes vazias)
+        dados_formatados = pd.DataFrame({
+            coluna: dados[coluna] if coluna in dados.columns else valores_padrao.get(coluna, '')
+            for coluna in colunas_esperadas
+        }, index=dados.index)
         
         return dados_formatados
     
     def _formatar_lancamentos(self, dados: pd.DataFrame) -> pd.DataFrame:
         """Formata dados de lançamentos conforme modelo Vyco"""
-        dados_formatados = dados.copy()
+        # Colunas conforme especificação Vyco
+        colunas_esperadas = [
+            'Confirmado', 'Data Emissão', 'Data', 'Valor Emissão', 'Valor',
+            'Repetição', 'Total Parcelas', 'Descrição', 'Categoria',
+            'Centro de Custo', 'Conta Corrente', 'Contato'
+        ]
+        
+        # Novo DataFrame na ordem final; as conversões abaixo valem só
+        # para colunas que vieram nos dados (as faltantes ficam vazias)
+        dados_formatados = self._garantir_colunas(dados, colunas_esperadas)
         
         # Formatar datas para o padrão brasileiro (dd/mm/yyyy)
-        if 'Data' in dados_formatados.columns:
-            dados_formatados['Data'] = dados_formatados['Data'].apply(self._formatar_data_brasileira)
+        if 'Data' in dados.columns:
+            dados_formatados['Data'] = self._formatar_datas_brasileiras(dados_formatados['Data'])
         
-        if 'Data Emissão' in dados_formatados.columns:
-            dados_formatados['Data Emissão'] = dados_formatados['Data Emissão'].apply(self._formatar_data_brasileira)
+        if 'Data Emissão' in dados.columns:
+            dados_formatados['Data Emissão'] = self._formatar_datas_brasileiras(dados_formatados['Data Emissão'])
         
         # Garantir formato de valor
-        if 'Valor' in dados_formatados.columns:
-            dados_formatados['Valor'] = pd.to_numeric(dados_formatados['Valor'], errors='coerce')
-            dados_formatados['Valor'] = dados_formatados['Valor'].round(2)
+        if 'Valor' in dados.columns:
+            dados_formatados['Valor'] = self._converter_valores(dados_formatados['Valor'])
         
         # Garantir formato de valor emissão se existir
-        if 'Valor Emissão' in dados_formatados.columns:
-            dados_formatados['Valor Emissão'] = pd.to_numeric(dados_formatados['Valor Emissão'], errors='coerce')
-            dados_formatados['Valor Emissão'] = dados_formatados['Valor Emissão'].round(2)
+        if 'Valor Emissão' in dados.columns:
+            dados_formatados['Valor Emissão'] = self._converter_valores(dados_formatados['Valor Emissão'])
         
         # Garantir formato de repetição
-        if 'Repetição' in dados_formatados.columns:
-            dados_formatados['Repetição'] = pd.to_numeric(dados_formatados['Repetição'], errors='coerce').fillna(0).astype(int)
+        if 'Repetição' in dados.columns:
+            dados_formatados['Repetição'] = self._converter_inteiros(dados_formatados['Repetição'], 0)
         
         # Garantir formato de total parcelas
-        if 'Total Parcelas' in dados_formatados.columns:
-            dados_formatados['Total Parcelas'] = pd.to_numeric(dados_formatados['Total Parcelas'], errors='coerce').fillna(1).astype(int)
+        if 'Total Parcelas' in dados.columns:
+            dados_formatados['Total Parcelas'] = self._converter_inteiros(dados_formatados['Total Parcelas'], 1)
         
-        # Colunas conforme especificação Vyco
-        colunas_esperadas = [
-            'Confirmado', 'Data Emissão', 'Data', 'Valor Emissão', 'Valor',
-            'Repetição', 'Total Parcelas', 'Descrição', 'Categoria',
-            'Centro de Custo', 'Conta Corrente', 'Contato'
-        ]
-        
-        return self._garantir_colunas(dados_formatados, colunas_esperadas)
+        return dados_formatados
     
     def _formatar_transferencias(self, dados: pd.DataFrame) -> pd.DataFrame:
         """Formata dados de transferências conforme modelo Vyco"""
-        dados_formatados = dados.copy()
-        
-        # Formatar datas para o padrão brasileiro (dd/mm/yyyy)
-        if 'Data' in dados_formatados.columns:
-            dados_formatados['Data'] = dados_formatados['Data'].apply(self._formatar_data_brasileira)
-        
-        # Garantir formato de valor
-        if 'Valor' in dados_formatados.columns:
-            dados_formatados['Valor'] = pd.to_numeric(dados_formatados['Valor'], errors='coerce')
-            dados_formatados['Valor'] = dados_formatados['Valor'].round(2)
-        
         # Garantir que temos todas as colunas conforme modelo Vyco
         colunas_esperadas = ['Data', 'Valor', 'Descrição', 'Conta Débito', 'Conta Crédito']
         
-        # Adicionar colunas faltantes
-        for coluna in colunas_esperadas:
-            if coluna not in dados_formatados.columns:
-                dados_formatados[coluna] = ''
+        # Novo DataFrame na ordem do modelo, colunas faltantes vazias
+        dados_formatados = self._garantir_colunas(dados, colunas_esperadas)
+        
+        # Formatar datas para o padrão brasileiro (dd/mm/yyyy)
+        if 'Data' in dados.columns:
+            dados_formatados['Data'] = self._formatar_datas_brasileiras(dados_formatados['Data'])
         
-        # Reordenar conforme modelo
-        dados_formatados = dados_formatados[colunas_esperadas]
+        # Garantir formato de valor
+        if 'Valor' in dados.columns:
+            dados_formatados['Valor'] = self._converter_valores(dados_formatados['Valor'])
         
         return dados_formatados
     
-    def _formatar_data_brasileira(self, data):
+    def _converter_valores(self, serie: pd.Series) -> np.ndarray:
         """
-        Formata data para o padrão brasileiro (dd/mm/yyyy)
+        Converte para número (inválidos viram NaN) e arredonda para 2 casas
+        
+        O arredondamento é feito no próprio array convertido, sem alocar
+        um segundo array intermediário.
         
         Args:
-            data: Data em qualquer formato válido
+            serie: Série com os valores
             
         Returns:
-            str: Data formatada em dd/mm/yyyy ou string vazia se inválida
+            np.ndarray: Valores em float64 arredondados
         """
-        try:
-            # Se já é string vazia ou None, retorna vazio
-            if pd.isna(data) or data == '' or str(data).lower() in ['nan', 'none', 'nat']:
-                return ''
-            
-            # Converter para datetime se necessário
-            if isinstance(data, str):
-                # Tentar diferentes formatos de entrada
-                for formato in ['%d/%m/%Y', '%Y-%m-%d', '%m/%d/%Y', '%d-%m-%Y']:
-                    try:
-                        data_obj = pd.to_datetime(data, format=formato)
-                        break
-                    except:
-                        continue
-                else:
-                    # Se nenhum formato funcionou, tentar conversão automática
-                    data_obj = pd.to_datetime(data, errors='coerce')
-            else:
-                data_obj = pd.to_datetime(data, errors='coerce')
-            
-            # Se a conversão falhou, retornar vazio
-            if pd.isna(data_obj):
-                return ''
+        valores = pd.to_numeric(serie, errors='coerce').to_numpy(
+            dtype=np.float64, na_value=np.nan, copy=True
+        )
+        np.round(valores, 2, out=valores)
+        return valores
+    
+    def _converter_inteiros(self, serie: pd.Series, padrao: int) -> np.ndarray:
+        """
+        Converte para inteiro, usando o padrão para valores inválidos ou vazios
+        
+        Args:
+            serie: Série com os valores
+            padrao: Valor usado no lugar de inválidos/vazios
             
-            # Retornar no formato brasileiro
-            return data_obj.strftime('%d/%m/%Y')
+        Returns:
+            np.ndarray: Valores em int64
+        """
+        valores = pd.to_numeric(serie, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        return np.nan_to_num(valores, nan=padrao).astype(np.int64)
+    
+    def _formatar_datas_brasileiras(self, datas: pd.Series) -> pd.Series:
+        """
+        Formata uma série de datas para o padrão brasileiro (dd/mm/yyyy)
+        
+        Conversão vetorizada: vazios ('', nan, None, NaT) são mascarados numa
+        única passada; cada formato conhecido é tentado só nas linhas que
+        ainda estão NaT e, se nenhum servir, a conversão é automática. Valores
+        que já são datas (datetime, Timestamp) passam em qualquer formato.
+        
+        Args:
+            datas: Série com datas em qualquer formato válido
             
-        except:
-            # Em caso de erro, retornar vazio
-            return ''
+        Returns:
+            pd.Series: Datas em dd/mm/yyyy ou string vazia se inválidas
+        """
+        resultado = pd.Series('', index=datas.index, dtype=object)
+        
+        # Máscara única de valores vazios/nulos
+        validos = datas.notna() & ~datas.astype(str).str.lower().isin(['', 'nan', 'none', 'nat'])
+        if not validos.any():
+            return resultado
+        
+        valores = datas[validos]
+        convertidas = pd.Series(pd.NaT, index=valores.index, dtype='datetime64[ns]')
+        
+        # Tentar cada formato só nas linhas ainda não convertidas (NaT)
+        for formato in ['%d/%m/%Y', '%Y-%m-%d', '%m/%d/%Y', '%d-%m-%Y', 'mixed']:
+            pendentes = convertidas.isna()
+            if not pendentes.any():
+                break
+            convertidas[pendentes] = pd.to_datetime(
+                valores[pendentes], format=formato, errors='coerce'
+            ).to_numpy()
+        
+        resultado[validos] = convertidas.dt.strftime('%d/%m/%Y').fillna('').to_numpy()
+        return resultado
     
     def _garantir_colunas(self, dados: pd.DataFrame, colunas_esperadas: List[str]) -> pd.DataFrame:
         """
@@ -459,18 +696,8 @@ class GeradorExcel:
         Returns:
             pd.DataFrame: DataFrame com todas as colunas
         """
-        dados_final = dados.copy()
-        
-        # Adicionar colunas faltantes
-        for coluna in colunas_esperadas:
-            if coluna not in dados_final.columns:
-                dados_final[coluna] = ""
-        
-        # Reordenar colunas
-        colunas_existentes = [col for col in colunas_esperadas if col in dados_final.columns]
-        dados_final = dados_final[colunas_existentes]
-        
-        return dados_final
+        # Um único reindex: reordena e cria as colunas faltantes vazias
+        return dados.reindex(columns=colunas_esperadas, fill_value="")
     
     def _aplicar_estrutura_modelo(self, tipo_planilha: str, dados: pd.DataFrame) -> pd.DataFrame:
         """
@@ -483,29 +710,18 @@ class GeradorExcel:
         Returns:
             pd.DataFrame: DataFrame com estrutura do modelo
         """
-        # Mapear tipo para arquivo modelo
-        mapeamento_modelos = {
-            'categorias': 'Cadastros - Categorias.xlsx',
-            'centros_custo': 'Cadastros - Centros de Custo.xlsx',
-            'contas_correntes': 'Cadastros - Contas Corrente.xlsx',
-            'contatos': 'Cadastros - Contatos.xlsx',
-            'lancamentos': 'Financeiro - Lançamentos.xlsx',
-            'transferencias': 'Financeiro - Transferências.xlsx'
-        }
-        
-        if tipo_planilha not in mapeamento_modelos:
+        if tipo_planilha not in self.MAPEAMENTO_ARQUIVOS:
             return dados
         
-        nome_arquivo_modelo = mapeamento_modelos[tipo_planilha]
+        nome_arquivo_modelo = self.MAPEAMENTO_ARQUIVOS[tipo_planilha]
         caminho_modelo = os.path.join(self.diretorio_modelos, nome_arquivo_modelo)
         
         try:
-            if os.path.exists(caminho_modelo):
-                # Ler estrutura do modelo
-                modelo = pd.read_excel(caminho_modelo)
-                
-                # Usar colunas do modelo como referência
-                colunas_modelo = modelo.columns.tolist()
+            if nome_arquivo_modelo in self.modelos_existentes:
+                # Usar colunas do modelo como referência (só o cabeçalho, em cache)
+                colunas_modelo = list(_carregar_colunas_modelo(
+                    caminho_modelo, os.path.getmtime(caminho_modelo)
+                ))
                 
                 # Garantir que o DataFrame tenha as colunas do modelo
                 dados_final = self._garantir_colunas(dados, colunas_modelo)
@@ -513,53 +729,63 @@ class GeradorExcel:
                 return dados_final
             
         except Exception as e:
-            st.warning(f"Não foi possível aplicar modelo para {tipo_planilha}: {str(e)}")
+            self.avisos.append(f"Não foi possível aplicar modelo para {tipo_planilha}: {str(e)}")
         
         return dados
     
-    def _aplicar_formatacao_excel(self, writer, tipo_planilha: str) -> None:
+    def _escrever_planilha_xlsxwriter(self, destino, tipo_planilha: str, dados: pd.DataFrame) -> None:
         """
-        Aplica formatação adicional ao arquivo Excel
+        Escreve os dados na aba 'Dados' usando xlsxwriter com constant_memory
+        
+        Nesse modo cada linha é descarregada assim que a seguinte começa, então
+        a escrita é feita linha a linha (o to_excel do pandas escreve por coluna).
         
         Args:
-            writer: ExcelWriter object
+            destino: Caminho ou buffer onde salvar o arquivo
             tipo_planilha: Tipo da planilha
+            dados: DataFrame com os dados finais
         """
+        workbook = xlsxwriter.Workbook(destino, {
+            'constant_memory': True,
+            'strings_to_urls': False,
+            'strings_to_formulas': False,
+            'default_date_format': 'yyyy-mm-dd hh:mm:ss'
+        })
+        
         try:
-            worksheet = writer.sheets['Dados']
+            worksheet = workbook.add_worksheet('Dados')
             
-            # Formatação básica
-            # Ajustar largura das colunas
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
+            # Cabeçalho no mesmo estilo usado pelo pandas
+            formato_cabecalho = workbook.add_format({
+                'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'
+            })
+            colunas = [str(coluna) for coluna in dados.columns]
+            worksheet.write_row(0, 0, colunas, formato_cabecalho)
             
-            # Aplicar formatação específica por tipo
+            # Formatação monetária nas colunas de valor
+            formatos = [None] * len(colunas)
             if tipo_planilha in ['lancamentos', 'transferencias']:
-                # Formatação para valores monetários
-                from openpyxl.styles import NamedStyle
-                
-                currency_style = NamedStyle(name='currency')
-                currency_style.number_format = 'R$ #,##0.00'
+                formato_moeda = workbook.add_format({'num_format': 'R$ #,##0.00'})
+                formatos = [formato_moeda if 'valor' in coluna.lower() else None for coluna in colunas]
+            
+            # Largura e formato definidos por coluna antes das linhas (exigência do
+            # constant_memory); células sem formato próprio herdam o da coluna
+            for coluna, largura in enumerate(self._calcular_larguras_colunas(dados)):
+                worksheet.set_column(coluna, coluna, largura, formatos[coluna])
+            
+            # Sem registros (ex: nenhuma transferência): só o cabeçalho
+            if dados.empty:
+                return
+            
+            # Tipo de cada coluna resolvido uma vez; o laço só chama o escritor
+            escritores = self._preparar_escritores_colunas(worksheet, dados)
+            
+            for linha in range(len(dados)):
+                for coluna, (valores, escrever) in enumerate(escritores):
+                    escrever(linha + 1, coluna, valores[linha])
                 
-                # Aplicar formatação em colunas de valor
-                for row in worksheet.iter_rows(min_row=2, max_row=worksheet.max_row):
-                    for cell in row:
-                        if 'valor' in str(worksheet.cell(1, cell.column).value).lower():
-                            cell.style = currency_style
-                            
-        except Exception as e:
-            st.warning(f"Aviso na formatação Excel: {str(e)}")
+        finally:
+            workbook.close()
     
     def ler_instrucoes_preenchimento(self, tipo_planilha: str) -> str:
         """
@@ -571,28 +797,16 @@ class GeradorExcel:
         Returns:
             str: Instruções de preenchimento
         """
-        mapeamento_instrucoes = {
-            'categorias': 'Cadastros - Categorias.txt',
-            'centros_custo': 'Cadastros - Centros de Custo.txt',
-            'contas_correntes': 'Cadastros - Contas Corrente.txt',
-            'contatos': 'Cadastros - Contatos.txt',
-            'lancamentos': 'Financeiro - Lançamentos.txt',
-            'transferencias': 'Financeiro - Transferências.txt'
-        }
-        
-        if tipo_planilha not in mapeamento_instrucoes:
+        if tipo_planilha not in self.MAPEAMENTO_INSTRUCOES:
             return "Instruções não disponíveis"
         
-        nome_arquivo = mapeamento_instrucoes[tipo_planilha]
+        nome_arquivo = self.MAPEAMENTO_INSTRUCOES[tipo_planilha]
         caminho_arquivo = os.path.join(self.diretorio_preenchimento, nome_arquivo)
         
         try:
-            if os.path.exists(caminho_arquivo):
-                with open(caminho_arquivo, 'r', encoding='utf-8') as arquivo:
-                    return arquivo.read()
-            else:
-                return f"Arquivo de instruções não encontrado: {caminho_arquivo}"
-                
+            return Path(caminho_arquivo).read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return f"Arquivo de instruções não encontrado: {caminho_arquivo}"
         except Exception as e:
             return f"Erro ao ler instruções: {str(e)}"
     
@@ -2,6 +2,10 @@ import pandas as pd
 import streamlit as st
 from typing import Union, Optional
 import io
+import zipfile
+import openpyxl
+from openpyxl.utils.exceptions import InvalidFileException
+from pandas.io.parsers import TextParser
 
 class ManipuladorArquivos:
     """Classe responsável por manipular arquivos Excel"""
@@ -20,20 +24,72 @@ class ManipuladorArquivos:
             pd.DataFrame: Dados do arquivo Excel
         """
         try:
-            # Se for um arquivo carregado pelo Streamlit
-            if hasattr(arquivo, 'read'):
-                dados = pd.read_excel(arquivo)
-            else:
-                dados = pd.read_excel(arquivo)
+            dados = self._ler_planilha(arquivo)
             
             # Limpar dados básicos
             dados = self._limpar_dados_basicos(dados)
             
+            # Colunas de texto em formato Arrow (comparações e agrupamentos mais rápidos)
+            dados = self._converter_textos_arrow(dados)
+            
             return dados
             
         except Exception as e:
             raise Exception(f"Erro ao ler arquivo Excel: {str(e)}")
     
+    def _ler_planilha(self, arquivo: Union[str, io.BytesIO]) -> pd.DataFrame:
+        """
+        Lê a planilha com o engine calamine (Rust), mais rápido que o openpyxl
+        
+        Args:
+            arquivo: Caminho do arquivo ou objeto BytesIO
+            
+        Returns:
+            pd.DataFrame: Dados brutos da planilha
+        """
+        try:
+            return pd.read_excel(arquivo, engine='calamine')
+        except ImportError:
+            # python-calamine não instalado: openpyxl em modo somente leitura
+            if hasattr(arquivo, 'seek'):
+                arquivo.seek(0)
+            try:
+                return self._ler_planilha_somente_leitura(arquivo)
+            except (InvalidFileException, zipfile.BadZipFile):
+                # Arquivos .xls não são suportados pelo openpyxl
+                if hasattr(arquivo, 'seek'):
+                    arquivo.seek(0)
+                return pd.read_excel(arquivo)
+    
+    def _ler_planilha_somente_leitura(self, arquivo: Union[str, io.BytesIO]) -> pd.DataFrame:
+        """
+        Lê a planilha ativa com openpyxl em modo read_only, iterando as linhas
+        sem montar o modelo completo de células em memória
+        
+        Args:
+            arquivo: Caminho do arquivo ou objeto BytesIO
+            
+        Returns:
+            pd.DataFrame: Dados brutos da planilha
+        """
+        workbook = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+        try:
+            # Células vazias viram '' como no leitor openpyxl do read_excel
+            linhas = [
+                ['' if valor is None else valor for valor in linha]
+                for linha in workbook.active.iter_rows(values_only=True)
+            ]
+        finally:
+            # Liberar o arquivo zip imediatamente
+            workbook.close()
+        
+        if not linhas:
+            return pd.DataFrame()
+        
+        # Mesmo parser do read_excel: cabeçalho, vazios como NaN e inferência
+        # de tipos (números gravados como texto viram números)
+        return TextParser(linhas, header=0).read()
+    
     def _limpar_dados_basicos(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Aplica limpeza básica nos dados
@@ -44,17 +100,35 @@ class ManipuladorArquivos:
         Returns:
             pd.DataFrame: DataFrame limpo
         """
-        # Remover linhas completamente vazias
-        df = df.dropna(how='all')
-        
-        # Remover colunas completamente vazias
-        df = df.dropna(axis=1, how='all')
+        # Remover linhas e colunas completamente vazias num único recorte,
+        # a partir de uma só máscara de valores preenchidos
+        preenchidos = df.notna().to_numpy()
+        df = df.iloc[preenchidos.any(axis=1), preenchidos.any(axis=0)]
         
         # Limpar nomes das colunas
         df.columns = df.columns.str.strip()
         
-        # Resetar índice
-        df = df.reset_index(drop=True)
+        # Resetar índice (sem copiar os dados)
+        df.index = pd.RangeIndex(len(df))
+        
+        return df
+    
+    def _converter_textos_arrow(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Converte colunas compostas apenas por texto para o dtype string[pyarrow]
+        
+        Colunas mistas (ex: datas e textos) continuam como object para não
+        alterar os valores originais.
+        
+        Args:
+            df: DataFrame lido da planilha
+            
+        Returns:
+            pd.DataFrame: DataFrame com colunas de texto em formato Arrow
+        """
+        for coluna in df.select_dtypes(include='object').columns:
+            if pd.api.types.infer_dtype(df[coluna], skipna=True) == 'string':
+                df[coluna] = df[coluna].astype('string[pyarrow]')
         
         return df
     
@@ -100,12 +174,15 @@ class ManipuladorArquivos:
         Returns:
             dict: Informações do arquivo
         """
+        total_registros = len(df)
+        
+        # count() conta os preenchidos sem montar um DataFrame booleano
         return {
-            'total_registros': len(df),
+            'total_registros': total_registros,
             'total_colunas': len(df.columns),
             'colunas': list(df.columns),
             'tipos_dados': df.dtypes.to_dict(),
-            'registros_vazios': df.isnull().sum().to_dict()
+            'registros_vazios': (total_registros - df.count()).to_dict()
         }
     
     def salvar_excel(self, df: pd.DataFrame, caminho: str, nome_planilha: str = 'Dados') -> None:
@@ -135,7 +212,7 @@ class ManipuladorArquivos:
             pd.DataFrame: Estrutura do modelo
         """
         try:
-            return pd.read_excel(caminho_modelo)
+            return self._ler_planilha(caminho_modelo)
         except Exception as e:
             raise Exception(f"Erro ao ler arquivo modelo: {str(e)}")
     
@@ -151,10 +228,10 @@ class ManipuladorArquivos:
         """
         try:
             with open(caminho_txt, 'r', encoding='utf-8') as arquivo:
-                linhas = arquivo.readlines()
-            
-            # Limpar linhas vazias e espaços
-            instrucoes = [linha.strip() for linha in linhas if linha.strip()]
+                # Limpar linhas vazias e espaços, strip uma vez por linha
+                instrucoes = [
+                    linha for linha in (linha.strip() for linha in arquivo) if linha
+                ]
             
             return instrucoes
             
@@ -1,20 +1,50 @@
 import pandas as pd
+import re
 import streamlit as st
+from datetime import datetime
+from functools import lru_cache
 from typing import List, Dict, Set
 
+try:
+    from rapidfuzz import fuzz, process, utils as rapidfuzz_utils
+except ImportError:
+    # rapidfuzz não instalado: sugestões pela busca de palavras
+    process = None
+
+# Padrões comuns de separação entre código e nome
+_SEPARADORES = (' - ', ' – ', ' — ', ' | ', ': ', ' :: ')
+
+# Código no início: numérico (grupo 1, ex: "2.2.1 ÁGUA") ou letra e números
+# (grupo 2, ex: "A1 ÁGUA"); grupo 3 é o nome. Um único match por categoria
+_CODE_RE = re.compile(r'^(?:(\d+(?:\.\d+)*)|([A-Za-z]\d+(?:\.\d+)*))\s+(.+)$')
+
+# Palavras-chave que indicam uma coluna de categoria, numa só alternância
+_CAT_KW_RE = re.compile('|'.join(map(re.escape, (
+    'categoria', 'plano', 'conta', 'classificacao', 'classificação',
+    'nome', 'descricao', 'descrição', 'grupo', 'tipo',
+    'receita', 'despesa', 'centro', 'custo'
+))))
+
+@st.cache_data(show_spinner=False)
+def _sugerir_categorias_cached(categorias_antigas: tuple, categorias_validas: tuple) -> dict:
+    """Calcula as sugestões de todas as categorias de uma vez, memorizado entre reruns"""
+    return MapeadorCategorias()._sugerir_categorias_similares(
+        list(categorias_antigas), list(categorias_validas)
+    )
+
 class MapeadorCategorias:
     """Classe responsável por mapear categorias antigas para novas"""
     
-    def __init__(self):
-        self.categorias_antigas = set()
-        self.categorias_novas = set()
-        self.categorias_inconsistentes = set()
-    
-    def _limpar_categoria(self, categoria_texto: str) -> tuple:
+    @staticmethod
+    @lru_cache(maxsize=4096, typed=True)
+    def _limpar_categoria(categoria_texto: str) -> tuple:
         """
         Separa código e nome da categoria
         Exemplo: "2.2.1 - ÁGUA" retorna ("2.2.1", "ÁGUA")
         
+        Memorizado: categorias repetidas no plano são limpas uma vez só
+        (typed=True para 2 e 2.0 não compartilharem o resultado).
+        
         Args:
             categoria_texto: Texto completo da categoria
             
@@ -26,64 +56,37 @@ class MapeadorCategorias:
         
         categoria_texto = categoria_texto.strip()
         
-        # Padrões comuns de separação
-        separadores = [' - ', ' – ', ' — ', ' | ', ': ', ' :: ']
-        
-        for separador in separadores:
+        for separador in _SEPARADORES:
             if separador in categoria_texto:
-                partes = categoria_texto.split(separador, 1)  # Divide apenas na primeira ocorrência
-                if len(partes) == 2:
-                    codigo = partes[0].strip()
-                    nome = partes[1].strip()
-                    return (codigo, nome)
+                # Divide apenas na primeira ocorrência
+                codigo, _, nome = categoria_texto.partition(separador)
+                return (codigo.strip(), nome.strip())
         
         # Se não encontrar separador, tenta identificar padrão de código no início
-        import re
-        
-        # Padrão: números e pontos no início (ex: "2.2.1 ÁGUA")
-        match = re.match(r'^(\d+(?:\.\d+)*)\s+(.+)$', categoria_texto)
-        if match:
-            codigo = match.group(1)
-            nome = match.group(2)
-            return (codigo, nome)
-        
-        # Padrão: letras e números no início (ex: "A1 ÁGUA")
-        match = re.match(r'^([A-Za-z]\d+(?:\.\d+)*)\s+(.+)$', categoria_texto)
+        match = _CODE_RE.match(categoria_texto)
         if match:
-            codigo = match.group(1)
-            nome = match.group(2)
-            return (codigo, nome)
+            return (match.group(1) or match.group(2), match.group(3))
         
         # Se nada funcionar, retorna vazio para código e o texto completo para nome
         return ("", categoria_texto)
     
-    def _processar_categorias_com_codigo(self, df: pd.DataFrame, coluna: str) -> pd.DataFrame:
+    def _nomes_limpos_unicos(self, df: pd.DataFrame, coluna: str) -> pd.Index:
         """
-        Processa DataFrame separando códigos dos nomes das categorias
+        Obtém os nomes limpos distintos de uma coluna de categorias
+        
+        Limpa só os valores distintos (não cada linha) e não monta as colunas
+        _Codigo/_Nome_Limpo quando só os nomes únicos interessam.
         
         Args:
-            df: DataFrame original
+            df: DataFrame com as categorias
             coluna: Nome da coluna com categorias
             
         Returns:
-            pd.DataFrame: DataFrame com colunas separadas
+            pd.Index: Nomes limpos, sem repetição
         """
-        df_processado = df.copy()
-        
-        # Aplicar limpeza em todas as categorias
-        codigos = []
-        nomes_limpos = []
-        
-        for categoria in df_processado[coluna]:
-            codigo, nome = self._limpar_categoria(categoria)
-            codigos.append(codigo)
-            nomes_limpos.append(nome)
-        
-        # Adicionar novas colunas
-        df_processado[f'{coluna}_Codigo'] = codigos
-        df_processado[f'{coluna}_Nome_Limpo'] = nomes_limpos
-        
-        return df_processado
+        limpar = self._limpar_categoria
+        valores_unicos = df[coluna].dropna().unique()
+        return pd.Index([limpar(valor)[1] for valor in valores_unicos], dtype=object).unique()
     
     def encontrar_categorias_inconsistentes(self, 
                                           dados_lancamentos: pd.DataFrame,
@@ -120,22 +123,22 @@ class MapeadorCategorias:
                 
                 coluna_categoria_plano = colunas_categoria_plano[0]
             
-            # Processar categorias do plano de contas para separar códigos dos nomes
-            dados_categorias_processados = self._processar_categorias_com_codigo(
-                dados_categorias, coluna_categoria_plano
-            )
+            # Usar nomes limpos do plano de contas (códigos separados dos nomes)
+            categorias_novas = self._nomes_limpos_unicos(dados_categorias, coluna_categoria_plano)
             
-            # Obter categorias únicas de cada fonte
-            self.categorias_antigas = set(dados_lancamentos[coluna_categoria_lancamentos].dropna().unique())
+            # Caso comum: toda categoria dos lançamentos já existe no plano.
+            # Um isin vetorizado basta; as únicas dos lançamentos nem são montadas
+            categorias_lancamentos = dados_lancamentos[coluna_categoria_lancamentos]
+            if (categorias_lancamentos.isin(categorias_novas) | categorias_lancamentos.isna()).all():
+                return []
             
-            # Usar nomes limpos do plano de contas
-            coluna_nomes_limpos = f'{coluna_categoria_plano}_Nome_Limpo'
-            self.categorias_novas = set(dados_categorias_processados[coluna_nomes_limpos].dropna().unique())
+            # Obter categorias únicas dos lançamentos
+            categorias_antigas = categorias_lancamentos.astype('category').cat.categories
             
-            # Encontrar categorias inconsistentes
-            self.categorias_inconsistentes = self.categorias_antigas - self.categorias_novas
+            # Encontrar categorias inconsistentes (Index.difference já ordena)
+            categorias_inconsistentes = categorias_antigas.difference(categorias_novas, sort=True)
             
-            return sorted(list(self.categorias_inconsistentes))
+            return categorias_inconsistentes.tolist()
             
         except Exception as e:
             st.error(f"Erro ao analisar categorias: {str(e)}")
@@ -151,32 +154,22 @@ class MapeadorCategorias:
         Returns:
             List[str]: Lista de nomes de colunas que podem ser categoria
         """
-        # Expandir palavras-chave para capturar mais variações
-        palavras_chave = [
-            'categoria', 'plano', 'conta', 'classificacao', 'classificação',
-            'nome', 'descricao', 'descrição', 'grupo', 'tipo',
-            'receita', 'despesa', 'centro', 'custo'
-        ]
+        # Uma busca vetorizada sobre os nomes das colunas
+        nomes_colunas = df.columns.astype(str).str.lower().str.strip()
+        com_palavra_chave = nomes_colunas.str.contains(_CAT_KW_RE, na=False)
+        colunas_encontradas = df.columns[com_palavra_chave].tolist()
         
-        colunas_encontradas = []
-        
-        for coluna in df.columns:
-            coluna_lower = coluna.lower().strip()
-            for palavra in palavras_chave:
-                if palavra in coluna_lower:
+        # Se não encontrar nada, tentar com a primeira coluna que contenha texto
+        # (heurística: basta olhar as primeiras 50 linhas, não o plano inteiro;
+        # colunas só de texto chegam da leitura como string[pyarrow])
+        if not colunas_encontradas:
+            primeiras_linhas = df.head(50)
+            for coluna in primeiras_linhas.select_dtypes(include=['object', 'string']).columns:
+                amostra = primeiras_linhas[coluna].dropna()
+                if not amostra.empty and isinstance(amostra.iat[0], str) and len(amostra.iat[0]) > 2:
                     colunas_encontradas.append(coluna)
                     break
         
-        # Se não encontrar nada, tentar com a primeira coluna que contenha texto
-        if not colunas_encontradas:            
-            for coluna in df.columns:
-                # Verificar se a coluna tem dados de texto (não numéricos)
-                if df[coluna].dtype == 'object' and not df[coluna].isna().all():
-                    amostra = df[coluna].dropna().iloc[0] if not df[coluna].dropna().empty else ""
-                    if isinstance(amostra, str) and len(amostra) > 2:
-                        colunas_encontradas.append(coluna)
-                        break
-        
         return colunas_encontradas
     
     def obter_categorias_validas(self, dados_categorias: pd.DataFrame, 
@@ -198,12 +191,8 @@ class MapeadorCategorias:
                     return []
                 coluna_categoria = colunas_categoria[0]
             
-            # Processar categorias para separar códigos dos nomes
-            dados_processados = self._processar_categorias_com_codigo(dados_categorias, coluna_categoria)
-            
-            # Usar nomes limpos
-            coluna_nomes_limpos = f'{coluna_categoria}_Nome_Limpo'
-            categorias_validas = dados_processados[coluna_nomes_limpos].dropna().unique()
+            # Usar nomes limpos (códigos separados dos nomes)
+            categorias_validas = self._nomes_limpos_unicos(dados_categorias, coluna_categoria)
             
             # Remover categorias vazias
             categorias_validas = [cat for cat in categorias_validas if cat.strip()]
@@ -235,6 +224,15 @@ class MapeadorCategorias:
         st.subheader("🔄 Mapeamento de Categorias")
 # Processar categorias inconsistentes
         
+        # Sugestões calculadas de uma vez (e em cache), fora do laço de widgets
+        sugestoes = _sugerir_categorias_cached(
+            tuple(categorias_inconsistentes), tuple(categorias_validas)
+        )
+        
+        # Posição de cada categoria nas opções do selectbox ("" ocupa a posição 0)
+        opcoes = [""] + categorias_validas
+        posicao_opcao = {categoria: posicao for posicao, categoria in enumerate(opcoes)}
+        
         # Criar interface para cada categoria inconsistente
         for i, categoria_antiga in enumerate(categorias_inconsistentes):
             with st.expander(f"Mapear: {categoria_antiga}", expanded=True):
@@ -246,15 +244,13 @@ class MapeadorCategorias:
                 
                 with col2:
                     # Tentar sugerir categoria similar
-                    categoria_sugerida = self._sugerir_categoria_similar(
-                        categoria_antiga, categorias_validas
-                    )
+                    categoria_sugerida = sugestoes.get(categoria_antiga, "")
                     
                     # Selectbox para escolha da nova categoria
                     categoria_nova = st.selectbox(
                         "Selecione a nova categoria:",
-                        options=[""] + categorias_validas,
-                        index=categorias_validas.index(categoria_sugerida) + 1 if categoria_sugerida else 0,
+                        options=opcoes,
+                        index=posicao_opcao.get(categoria_sugerida, 0),
                         key=f"mapeamento_{i}_{categoria_antiga}",
                         help=f"Selecione a categoria do novo plano para substituir '{categoria_antiga}'"
                     )
@@ -267,37 +263,114 @@ class MapeadorCategorias:
         
         return mapeamento
     
-    def _sugerir_categoria_similar(self, categoria_antiga: str, categorias_validas: List[str]) -> str:
+    def _indexar_categorias_validas(self, categorias_validas: List[str]) -> tuple:
         """
-        Sugere uma categoria similar baseada em similaridade de texto
+        Monta o índice usado por _sugerir_categoria_similar
+        
+        Cada nome é normalizado (casefold + strip) e quebrado em palavras uma
+        única vez, em vez de a cada categoria inconsistente.
         
         Args:
-            categoria_antiga: Categoria que precisa ser mapeada
             categorias_validas: Lista de categorias válidas
             
         Returns:
-            str: Categoria sugerida (ou string vazia se nenhuma for encontrada)
+            tuple: (categorias, nome normalizado -> categoria, palavra com mais
+                   de 3 caracteres -> posição da primeira categoria que a contém)
+        """
+        exatas = {}
+        palavras = {}
+        for posicao, categoria in enumerate(categorias_validas):
+            categoria_normalizada = categoria.casefold().strip()
+            exatas.setdefault(categoria_normalizada, categoria)
+            for palavra in categoria_normalizada.split():
+                if len(palavra) > 3:
+                    palavras.setdefault(palavra, posicao)
+        
+        return list(categorias_validas), exatas, palavras
+    
+    def _sugerir_categorias_similares(self, categorias_antigas: List[str],
+                                      categorias_validas: List[str]) -> Dict[str, str]:
         """
-        categoria_antiga_lower = categoria_antiga.lower()
+        Sugere uma categoria válida para cada categoria antiga numa única chamada
         
-        # Buscar por correspondência exata
-        for categoria in categorias_validas:
-            if categoria.lower() == categoria_antiga_lower:
-                return categoria
+        Com rapidfuzz, as notas de todas as combinações saem de um só
+        process.cdist (paralelo); sem ele, usa _sugerir_categoria_similar.
         
-        # Buscar por correspondência parcial
-        for categoria in categorias_validas:
-            categoria_lower = categoria.lower()
+        Args:
+            categorias_antigas: Categorias que precisam ser mapeadas
+            categorias_validas: Lista de categorias válidas
             
-            # Verificar se alguma palavra da categoria antiga está na nova
-            palavras_antigas = categoria_antiga_lower.split()
-            palavras_novas = categoria_lower.split()
+        Returns:
+            Dict[str, str]: categoria_antiga -> sugestão ("" se nenhuma)
+        """
+        indice_validas = self._indexar_categorias_validas(categorias_validas)
+        
+        if process is None or not categorias_validas:
+            return {
+                categoria_antiga: self._sugerir_categoria_similar(categoria_antiga, indice_validas)
+                for categoria_antiga in categorias_antigas
+            }
+        
+        # Correspondências exatas primeiro; o restante vai para o cdist
+        exatas = indice_validas[1]
+        sugestoes = {}
+        pendentes = []
+        for categoria_antiga in categorias_antigas:
+            categoria_exata = exatas.get(categoria_antiga.casefold().strip())
+            if categoria_exata is not None:
+                sugestoes[categoria_antiga] = categoria_exata
+            else:
+                pendentes.append(categoria_antiga)
+        
+        if pendentes:
+            # Notas abaixo do corte saem como 0
+            notas = process.cdist(
+                pendentes, categorias_validas,
+                scorer=fuzz.WRatio, processor=rapidfuzz_utils.default_process,
+                score_cutoff=60, workers=-1
+            )
+            melhores = notas.argmax(axis=1)
+            for categoria_antiga, nota_linha, melhor in zip(pendentes, notas, melhores):
+                sugestoes[categoria_antiga] = categorias_validas[melhor] if nota_linha[melhor] > 0 else ""
+        
+        return sugestoes
+    
+    def _sugerir_categoria_similar(self, categoria_antiga: str, indice_validas: tuple) -> str:
+        """
+        Sugere uma categoria similar baseada em similaridade de texto
+        
+        Args:
+            categoria_antiga: Categoria que precisa ser mapeada
+            indice_validas: Índice retornado por _indexar_categorias_validas
             
-            for palavra_antiga in palavras_antigas:
-                if len(palavra_antiga) > 3:  # Apenas palavras com mais de 3 caracteres
-                    for palavra_nova in palavras_novas:
-                        if palavra_antiga in palavra_nova or palavra_nova in palavra_antiga:
-                            return categoria
+        Returns:
+            str: Categoria sugerida (ou string vazia se nenhuma for encontrada)
+        """
+        categorias_validas, exatas, palavras_validas = indice_validas
+        categoria_antiga_normalizada = categoria_antiga.casefold().strip()
+        
+        # Buscar por correspondência exata
+        if categoria_antiga_normalizada in exatas:
+            return exatas[categoria_antiga_normalizada]
+        
+        # Buscar a categoria mais parecida (WRatio em C++), não só a primeira
+        if process is not None:
+            melhor = process.extractOne(
+                categoria_antiga, categorias_validas,
+                scorer=fuzz.WRatio, processor=rapidfuzz_utils.default_process,
+                score_cutoff=60
+            )
+            return melhor[0] if melhor else ""
+        
+        # Buscar por palavra em comum (com mais de 3 caracteres): vale a
+        # primeira categoria, na ordem da lista, que tenha alguma delas
+        posicoes = [
+            palavras_validas[palavra]
+            for palavra in categoria_antiga_normalizada.split()
+            if len(palavra) > 3 and palavra in palavras_validas
+        ]
+        if posicoes:
+            return categorias_validas[min(posicoes)]
         
         # Se nenhuma correspondência for encontrada, retornar vazio
         return ""
@@ -350,7 +423,7 @@ class MapeadorCategorias:
             for k, v in mapeamento.items()
         ])
         
-        st.dataframe(df_mapeamento, use_container_width=True)
+        st.dataframe(df_mapeamento, width="stretch")
         
         # Estatísticas
         # Mapeamento concluído
@@ -364,12 +437,21 @@ class MapeadorCategorias:
             caminho: Caminho do arquivo para salvar
         """
         try:
-            df_mapeamento = pd.DataFrame([
-                {"categoria_antiga": k, "categoria_nova": v, "data_mapeamento": pd.Timestamp.now()}
-                for k, v in mapeamento.items()
-            ])
+            # Categorias novas se repetem muito: colunas categóricas
+            df_mapeamento = pd.DataFrame({
+                "categoria_antiga": pd.Categorical(list(mapeamento.keys())),
+                "categoria_nova": pd.Categorical(list(mapeamento.values())),
+            })
             
-            df_mapeamento.to_excel(caminho, index=False)
+            # Data do mapeamento uma vez, nas propriedades do arquivo
+            data_mapeamento = datetime.now()
+            
+            with pd.ExcelWriter(caminho, engine='xlsxwriter') as writer:
+                df_mapeamento.to_excel(writer, index=False, sheet_name='mapeamento')
+                writer.book.set_properties({
+                    'created': data_mapeamento,
+                    'comments': f"Mapeamento de {data_mapeamento.strftime('%d/%m/%Y %H:%M:%S')}",
+                })
             
         except Exception as e:
             st.error(f"Erro ao salvar mapeamento: {str(e)}")
@@ -385,7 +467,16 @@ class MapeadorCategorias:
             Dict[str, str]: Mapeamento carregado
         """
         try:
-            df_mapeamento = pd.read_excel(caminho)
+            # Só as duas colunas usadas (arquivos antigos também têm data_mapeamento);
+            # o usecols por função não falha sozinho se alguma delas faltar
+            colunas_mapeamento = ('categoria_antiga', 'categoria_nova')
+            df_mapeamento = pd.read_excel(
+                caminho, usecols=lambda coluna: coluna in colunas_mapeamento, dtype='category'
+            )
+            
+            colunas_faltantes = [coluna for coluna in colunas_mapeamento if coluna not in df_mapeamento.columns]
+            if colunas_faltantes:
+                raise ValueError(f"Colunas não encontradas no arquivo: {', '.join(colunas_faltantes)}")
             
             mapeamento = dict(zip(
                 df_mapeamento['categoria_antiga'],
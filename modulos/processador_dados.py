@@ -1,8 +1,13 @@
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import re
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+# Datas no formato dia/mês/ano ou mês/dia/ano com ano de 4 dígitos
+_DATA_BARRAS_RE = re.compile(r'^(\d{1,2})/(\d{1,2})/\d{4}$')
+
 class ProcessadorDados:
     """Classe responsável por processar e transformar os dados do V1 para Vyco"""
     
@@ -27,20 +32,24 @@ class ProcessadorDados:
             Dict com todos os DataFrames processados
         """
         try:
+            # Nomes das colunas em minúsculas calculados uma vez só: o mapeamento
+            # não renomeia colunas, então servem para todas as buscas abaixo
+            colunas_minusculas = self._colunas_minusculas(dados_lancamentos)
+            
             # Aplicar mapeamento de categorias nos lançamentos se existir
             if mapeamento_categorias:
                 dados_lancamentos_processados = self._aplicar_mapeamento_categorias(
-                    dados_lancamentos, mapeamento_categorias
+                    dados_lancamentos, mapeamento_categorias, colunas_minusculas
                 )
             else:
-                dados_lancamentos_processados = dados_lancamentos.copy()
+                dados_lancamentos_processados = dados_lancamentos
             
             # Processar cada tipo de dados
             self.dados_processados = {
                 'categorias': self._processar_categorias(dados_categorias),
-                'centros_custo': self._processar_centros_custo(dados_lancamentos_processados),
-                'contas_correntes': self._processar_contas_correntes(dados_lancamentos_processados),
-                'contatos': self._processar_contatos(dados_lancamentos_processados),
+                'centros_custo': self._processar_centros_custo(dados_lancamentos_processados, colunas_minusculas),
+                'contas_correntes': self._processar_contas_correntes(dados_lancamentos_processados, colunas_minusculas),
+                'contatos': self._processar_contatos(dados_lancamentos_processados, colunas_minusculas),
                 'lancamentos': self._processar_lancamentos(dados_lancamentos_processados),
                 'transferencias': self._processar_transferencias(dados_transferencias)
             }
@@ -50,36 +59,80 @@ class ProcessadorDados:
         except Exception as e:
             raise Exception(f"Erro ao processar dados: {str(e)}")
     
+    def _colunas_minusculas(self, dados: pd.DataFrame) -> Dict[str, str]:
+        """
+        Associa cada coluna ao seu nome em minúsculas, na ordem do DataFrame
+        
+        Args:
+            dados: DataFrame cujas colunas serão indexadas
+            
+        Returns:
+            Dict[str, str]: Nome original da coluna -> nome em minúsculas
+        """
+        return {col: col.lower() for col in dados.columns}
+    
     def _aplicar_mapeamento_categorias(self, 
                                       dados_lancamentos: pd.DataFrame, 
-                                      mapeamento: Dict[str, str]) -> pd.DataFrame:
+                                      mapeamento: Dict[str, str],
+                                      colunas_minusculas: Optional[Dict[str, str]] = None) -> pd.DataFrame:
         """
         Aplica o mapeamento de categorias antigas para novas
         
         Args:
             dados_lancamentos: DataFrame com lançamentos
             mapeamento: Dicionário com mapeamento de categorias
+            colunas_minusculas: Nomes das colunas em minúsculas (calculados se omitidos)
             
         Returns:
             pd.DataFrame: Lançamentos com categorias atualizadas
         """
-        dados_processados = dados_lancamentos.copy()
+        if colunas_minusculas is None:
+            colunas_minusculas = self._colunas_minusculas(dados_lancamentos)
         
         # CORREÇÃO: Procurar especificamente pela coluna 'Categoria' (não 'CodigoCategoria')
-        colunas_categoria = [col for col in dados_processados.columns 
+        colunas_categoria = [col for col, col_lower in colunas_minusculas.items() 
                            if col == 'Categoria' or 
-                           ('categoria' in col.lower() and 'codigo' not in col.lower()) or
-                           'plano' in col.lower()]
+                           ('categoria' in col_lower and 'codigo' not in col_lower) or
+                           'plano' in col_lower]
         
         if colunas_categoria:
-            coluna_categoria = colunas_categoria[0]
-            
             # Aplicar mapeamento
-            for categoria_antiga, categoria_nova in mapeamento.items():
-                mask = dados_processados[coluna_categoria] == categoria_antiga
-                dados_processados.loc[mask, coluna_categoria] = categoria_nova
+            return self.aplicar_mapeamento(dados_lancamentos, mapeamento, colunas_categoria[0])
         
-        return dados_processados
+        return dados_lancamentos
+    
+    def aplicar_mapeamento(self, 
+                           dados: pd.DataFrame, 
+                           mapeamento: Dict[str, str],
+                           coluna: str = 'Categoria') -> pd.DataFrame:
+        """
+        Substitui as categorias de uma coluna em uma única passada vetorizada
+        
+        O mapeamento é aplicado só às categorias distintas (factorize) e o
+        resultado volta às linhas por posição; valores nulos são mantidos.
+        
+        Args:
+            dados: DataFrame com a coluna de categorias
+            mapeamento: Dicionário com mapeamento de categorias antigas para novas
+            coluna: Nome da coluna de categorias
+            
+        Returns:
+            pd.DataFrame: Cópia dos dados com as categorias substituídas
+        """
+        categorias = dados[coluna]
+        codigos, unicas = pd.factorize(categorias)
+        
+        # Categorias fora do mapeamento viram NaN no map e voltam ao valor original
+        unicas = pd.Series(unicas)
+        novas = unicas.map(mapeamento).fillna(unicas).to_numpy(dtype=object)
+        
+        # Posição extra no fim para o código -1 (nulo), que recebe o valor original
+        valores = np.append(novas, None)[codigos]
+        nulos = codigos == -1
+        if nulos.any():
+            valores[nulos] = categorias.to_numpy(dtype=object)[nulos]
+        
+        return dados.assign(**{coluna: pd.Series(valores, index=categorias.index)})
     
     def _processar_categorias(self, dados_categorias: pd.DataFrame) -> pd.DataFrame:
         """
@@ -92,7 +145,9 @@ class ProcessadorDados:
         Returns:
             pd.DataFrame: Categorias processadas para Vyco
         """
-        categorias_processadas = dados_categorias.copy()
+        # Cópia rasa: as colunas são sempre substituídas inteiras, nunca
+        # alteradas no lugar, então os dados de entrada ficam intactos
+        categorias_processadas = dados_categorias.copy(deep=False)
         
         # Garantir que temos coluna Codigo
         if 'Codigo' not in categorias_processadas.columns:
@@ -109,28 +164,31 @@ class ProcessadorDados:
                 # Usar a coluna encontrada como código
                 categorias_processadas['Codigo'] = categorias_processadas[coluna_codigo_encontrada]
             elif 'Nome' in categorias_processadas.columns:
-                # Tentar extrair códigos do formato "2.2.1 - ÁGUA"
-                codigos = []
-                nomes_limpos = []
+                # Tentar extrair códigos do formato "2.2.1 - ÁGUA", numa só passada
+                # sobre o array, preenchendo os resultados por posição
+                nomes = categorias_processadas['Nome'].to_numpy()
+                codigos = np.full(len(nomes), '', dtype=object)
+                nomes_limpos = np.empty(len(nomes), dtype=object)
                 
-                for item in categorias_processadas['Nome']:
-                    if isinstance(item, str) and ' - ' in item:
-                        partes = item.split(' - ', 1)
-                        if len(partes) == 2:
-                            codigos.append(partes[0].strip())
-                            nomes_limpos.append(partes[1].strip())
+                for posicao, item in enumerate(nomes):
+                    if isinstance(item, str):
+                        if ' - ' in item:
+                            codigo, _, nome = item.partition(' - ')
+                            codigos[posicao] = codigo.strip()
+                            nomes_limpos[posicao] = nome.strip()
                         else:
-                            codigos.append('')
-                            nomes_limpos.append(item)
+                            nomes_limpos[posicao] = item
+                    elif item is None or item is pd.NA:
+                        # Células vazias de colunas string[pyarrow] chegam como pd.NA
+                        nomes_limpos[posicao] = ''
                     else:
-                        codigos.append('')
-                        nomes_limpos.append(str(item) if item is not None else '')
+                        nomes_limpos[posicao] = str(item)
                 
                 categorias_processadas['Codigo'] = codigos
                 categorias_processadas['Nome'] = nomes_limpos
             else:
                 # Criar códigos sequenciais se não houver nenhuma informação
-                categorias_processadas['Codigo'] = range(1, len(categorias_processadas) + 1)
+                categorias_processadas['Codigo'] = np.arange(1, len(categorias_processadas) + 1, dtype=np.int64)
         
         # Garantir que temos coluna Nome
         if 'Nome' not in categorias_processadas.columns:
@@ -150,19 +208,41 @@ class ProcessadorDados:
         
         return categorias_processadas[colunas_finais]
     
-    def _processar_centros_custo(self, dados_lancamentos: pd.DataFrame) -> pd.DataFrame:
+    def _valores_unicos(self, serie: pd.Series):
+        """
+        Obtém os valores distintos não nulos de uma coluna, na ordem em que aparecem
+        
+        Os nulos são removidos depois do unique, só entre os distintos, em vez
+        de criar uma cópia filtrada da coluna inteira com dropna.
+        
+        Args:
+            serie: Coluna dos lançamentos
+            
+        Returns:
+            Array com os valores distintos não nulos
+        """
+        unicos = serie.unique()
+        return unicos[pd.notna(unicos)]
+    
+    def _processar_centros_custo(self, 
+                                 dados_lancamentos: pd.DataFrame,
+                                 colunas_minusculas: Optional[Dict[str, str]] = None) -> pd.DataFrame:
         """
         Extrai centros de custo únicos dos lançamentos
         
         Args:
             dados_lancamentos: DataFrame com lançamentos
+            colunas_minusculas: Nomes das colunas em minúsculas (calculados se omitidos)
             
         Returns:
             pd.DataFrame: Centros de custo no formato Vyco
         """
+        if colunas_minusculas is None:
+            colunas_minusculas = self._colunas_minusculas(dados_lancamentos)
+        
         # Encontrar coluna de centro de custo
-        colunas_centro_custo = [col for col in dados_lancamentos.columns 
-                               if 'centro' in col.lower() and 'custo' in col.lower()]
+        colunas_centro_custo = [col for col, col_lower in colunas_minusculas.items() 
+                               if 'centro' in col_lower and 'custo' in col_lower]
         
         if not colunas_centro_custo:
             # Se não encontrar, criar DataFrame vazio com estrutura
@@ -171,30 +251,36 @@ class ProcessadorDados:
         coluna_centro_custo = colunas_centro_custo[0]
         
         # Obter valores únicos, removendo NaN
-        centros_unicos = dados_lancamentos[coluna_centro_custo].dropna().unique()
+        centros_unicos = self._valores_unicos(dados_lancamentos[coluna_centro_custo])
         
         # Criar DataFrame
         centros_custo = pd.DataFrame({
-            'Codigo': range(1, len(centros_unicos) + 1),
+            'Codigo': np.arange(1, len(centros_unicos) + 1, dtype=np.int64),
             'Nome': centros_unicos,
             'Ativo': 'Sim'
         })
         
         return centros_custo
     
-    def _processar_contas_correntes(self, dados_lancamentos: pd.DataFrame) -> pd.DataFrame:
+    def _processar_contas_correntes(self, 
+                                    dados_lancamentos: pd.DataFrame,
+                                    colunas_minusculas: Optional[Dict[str, str]] = None) -> pd.DataFrame:
         """
         Extrai contas correntes únicas dos lançamentos
         
         Args:
             dados_lancamentos: DataFrame com lançamentos
+            colunas_minusculas: Nomes das colunas em minúsculas (calculados se omitidos)
             
         Returns:
             pd.DataFrame: Contas correntes no formato Vyco
         """
+        if colunas_minusculas is None:
+            colunas_minusculas = self._colunas_minusculas(dados_lancamentos)
+        
         # Encontrar coluna de conta corrente
-        colunas_conta = [col for col in dados_lancamentos.columns 
-                        if 'conta' in col.lower() or 'banco' in col.lower()]
+        colunas_conta = [col for col, col_lower in colunas_minusculas.items() 
+                        if 'conta' in col_lower or 'banco' in col_lower]
         
         if not colunas_conta:
             return pd.DataFrame(columns=['Codigo', 'Nome', 'Tipo', 'Ativo', 'DataInicial'])
@@ -202,14 +288,14 @@ class ProcessadorDados:
         coluna_conta = colunas_conta[0]
         
         # Encontrar coluna de data
-        colunas_data = [col for col in dados_lancamentos.columns 
-                       if 'data' in col.lower() and col.lower() != 'datacompetencia']
+        colunas_data = [col for col, col_lower in colunas_minusculas.items() 
+                       if 'data' in col_lower and col_lower != 'datacompetencia']
         
         if not colunas_data:
             # Se não encontrar coluna de data, usar valores únicos simples
-            contas_unicas = dados_lancamentos[coluna_conta].dropna().unique()
+            contas_unicas = self._valores_unicos(dados_lancamentos[coluna_conta])
             contas_correntes = pd.DataFrame({
-                'Codigo': range(1, len(contas_unicas) + 1),
+                'Codigo': np.arange(1, len(contas_unicas) + 1, dtype=np.int64),
                 'Nome': contas_unicas,
                 'Tipo': 1,
                 'Ativo': 'Sim',
@@ -219,59 +305,79 @@ class ProcessadorDados:
         
         coluna_data = colunas_data[0]
         
-        # Converter coluna de data para datetime
-        dados_com_data = dados_lancamentos.copy()
-        # Tentar diferentes formatos de data
-        dados_com_data[coluna_data] = pd.to_datetime(dados_com_data[coluna_data], 
-                                                    format='%d/%m/%Y', errors='coerce')
-        if dados_com_data[coluna_data].isna().all():
-            # Se falhou, tentar formato americano
-            dados_com_data[coluna_data] = pd.to_datetime(dados_com_data[coluna_data], 
-                                                        format='%m/%d/%Y', errors='coerce')
-        if dados_com_data[coluna_data].isna().all():
-            # Se ainda falhou, usar inferência automática
-            dados_com_data[coluna_data] = pd.to_datetime(dados_com_data[coluna_data], errors='coerce')
-        
-        # Calcular primeira data para cada conta
-        contas_com_data = []
-        for conta in dados_com_data[coluna_conta].dropna().unique():
-            movimentacoes_conta = dados_com_data[dados_com_data[coluna_conta] == conta]
-            primeira_data = movimentacoes_conta[coluna_data].min()
-            
-            if pd.notna(primeira_data):
-                # Data inicial = primeira movimentação - 1 dia
-                data_inicial = primeira_data - pd.Timedelta(days=1)
-                data_inicial_str = data_inicial.strftime('%d/%m/%Y')
-            else:
-                data_inicial_str = ''
-            
-            contas_com_data.append({
-                'Nome': conta,
-                'Tipo': 1,
-                'Ativo': 'Sim',
-                'DataInicial': data_inicial_str
-            })
+        # Converter coluna de data para datetime, escolhendo o formato por uma
+        # amostra para analisar a coluna uma vez só (cache=True converte cada
+        # texto distinto uma única vez)
+        valores_data = dados_lancamentos[coluna_data]
+        if pd.api.types.is_datetime64_any_dtype(valores_data):
+            datas = valores_data
+        else:
+            formato = self._detectar_formato_data(valores_data)
+            datas = pd.to_datetime(valores_data, format=formato, errors='coerce', cache=True)
+        
+        # Primeira data de cada conta num único groupby (contas na ordem em que
+        # aparecem; contas sem data válida ficam com NaT)
+        primeiras_datas = datas.groupby(dados_lancamentos[coluna_conta], sort=False).min()
+        
+        # Data inicial = primeira movimentação - 1 dia
+        datas_iniciais = (primeiras_datas - pd.Timedelta(days=1)).dt.strftime('%d/%m/%Y').fillna('')
         
         # Criar DataFrame final
-        contas_correntes = pd.DataFrame(contas_com_data)
-        contas_correntes['Codigo'] = range(1, len(contas_correntes) + 1)
+        contas_correntes = pd.DataFrame({
+            'Nome': primeiras_datas.index.to_numpy(),
+            'Tipo': 1,
+            'Ativo': 'Sim',
+            'DataInicial': datas_iniciais.to_numpy(),
+            'Codigo': np.arange(1, len(primeiras_datas) + 1, dtype=np.int64)
+        })
         
         return contas_correntes
     
-    def _processar_contatos(self, dados_lancamentos: pd.DataFrame) -> pd.DataFrame:
+    def _detectar_formato_data(self, valores: pd.Series) -> Optional[str]:
+        """
+        Detecta o formato das datas a partir de uma amostra dos valores
+        
+        Args:
+            valores: Série com as datas em texto
+            
+        Returns:
+            Optional[str]: Formato para pd.to_datetime ou None para inferência automática
+        """
+        amostra = valores.dropna().head(50).astype(str).str.strip()
+        partes = [_DATA_BARRAS_RE.match(valor) for valor in amostra]
+        
+        if not partes or not all(partes):
+            # Sem amostra ou fora do padrão com barras: usar inferência automática
+            return None
+        
+        # Primeiro campo acima de 12 só pode ser dia; o segundo, só o dia americano
+        if any(int(parte.group(1)) > 12 for parte in partes):
+            return '%d/%m/%Y'
+        if any(int(parte.group(2)) > 12 for parte in partes):
+            return '%m/%d/%Y'
+        
+        # Ambíguo: manter o padrão brasileiro
+        return '%d/%m/%Y'
+    
+    def _processar_contatos(self, 
+                            dados_lancamentos: pd.DataFrame,
+                            colunas_minusculas: Optional[Dict[str, str]] = None) -> pd.DataFrame:
         """
         Extrai contatos únicos dos lançamentos conforme especificação Vyco
         
         Args:
             dados_lancamentos: DataFrame com lançamentos
+            colunas_minusculas: Nomes das colunas em minúsculas (calculados se omitidos)
             
         Returns:
             pd.DataFrame: Contatos no formato Vyco completo
         """
+        if colunas_minusculas is None:
+            colunas_minusculas = self._colunas_minusculas(dados_lancamentos)
+
         # Encontrar coluna de contato com busca mais ampla
         colunas_contato = []
-        for col in dados_lancamentos.columns:
-            col_lower = col.lower()
+        for col, col_lower in colunas_minusculas.items():
             if any(palavra in col_lower for palavra in ['contato', 'cliente', 'fornecedor', 'pessoa', 'empresa']):
                 colunas_contato.append(col)
         
@@ -289,31 +395,31 @@ class ProcessadorDados:
         
         coluna_contato = colunas_contato[0]
 
-        # Obter valores únicos, removendo vazios e nulos
-        contatos_series = dados_lancamentos[coluna_contato].dropna()
-        contatos_series = contatos_series[contatos_series != '']  # Remover strings vazias
-        contatos_unicos = contatos_series.unique()
+        # Obter valores únicos, removendo vazios e nulos (strip só nos únicos)
+        valores_contato = dados_lancamentos[coluna_contato]
+        if isinstance(valores_contato.dtype, pd.StringDtype):
+            # Texto já em Arrow (lido como string[pyarrow]): strip e comparação
+            # rodam direto no buffer, sem converter para objetos Python
+            nomes_contatos = pd.Series(self._valores_unicos(valores_contato)).str.strip()
+        else:
+            contatos_unicos = pd.Series(self._valores_unicos(valores_contato), dtype=object)
+            nomes_contatos = contatos_unicos.astype(str).str.strip()
+        nomes_contatos = nomes_contatos[nomes_contatos != ''].drop_duplicates().to_numpy()
 
-        # Criar DataFrame com estrutura completa do Vyco
-        contatos_data = []
-        for contato in contatos_unicos:
-            # Ignorar valores nulos ou vazios
-            if pd.notna(contato) and str(contato).strip() != '':
-                contatos_data.append({
-                    'Nome': str(contato).strip(),
-                    'Tipo': 0,  # 0 - Não Identificado (padrão)
-                    'Documento': '',  # Vazio
-                    'E-mail': '',  # Vazio
-                    'Enviar e-mail?': '',  # Não
-                    'Telefone Residencial': '',  # Vazio
-                    'Telefone Comercial': '',  # Vazio
-                    'Telefone Celular': '',  # Vazio
-                    'Contribuinte ICMS?': '',  # Não
-                    'Inscrição Estadual': '',  # Vazio
-                    'Inscrição Municipal': ''  # Vazio
-                })
-
-        return pd.DataFrame(contatos_data)
+        # Criar DataFrame com estrutura completa do Vyco (colunas fixas por broadcast)
+        return pd.DataFrame({
+            'Nome': nomes_contatos,
+            'Tipo': 0,  # 0 - Não Identificado (padrão)
+            'Documento': '',  # Vazio
+            'E-mail': '',  # Vazio
+            'Enviar e-mail?': '',  # Não
+            'Telefone Residencial': '',  # Vazio
+            'Telefone Comercial': '',  # Vazio
+            'Telefone Celular': '',  # Vazio
+            'Contribuinte ICMS?': '',  # Não
+            'Inscrição Estadual': '',  # Vazio
+            'Inscrição Municipal': ''  # Vazio
+        })
 
     def _processar_lancamentos(self, dados_lancamentos: pd.DataFrame) -> pd.DataFrame:
         """
@@ -326,38 +432,37 @@ class ProcessadorDados:
         Returns:
             pd.DataFrame: Lançamentos no formato Vyco
         """
-        # Criar DataFrame com a estrutura Vyco completa
-        lancamentos_vyco = pd.DataFrame()
+        colunas = dados_lancamentos.columns
         
-        # Mapeamento direto das colunas V1 para Vyco
+        # Criar DataFrame com a estrutura Vyco completa de uma vez, a partir das
+        # colunas já prontas (evita realocar o DataFrame a cada coluna incluída)
         # IMPORTANTE: usar dados_lancamentos que já vem com mapeamento aplicado
-        
-        # Campos obrigatórios - mapeamento direto
-        lancamentos_vyco['Confirmado'] = dados_lancamentos['Confirmado'] if 'Confirmado' in dados_lancamentos.columns else 'Sim'
-        # Para Data, fazer cópia direta primeiro (será tratada no final)
-        lancamentos_vyco['Data'] = dados_lancamentos['Data'] if 'Data' in dados_lancamentos.columns else ''
-        lancamentos_vyco['Valor'] = dados_lancamentos['Valor'] if 'Valor' in dados_lancamentos.columns else 0
-        # Usar dados já com mapeamento aplicado
-        lancamentos_vyco['Categoria'] = dados_lancamentos['Categoria'] if 'Categoria' in dados_lancamentos.columns else ''
-        
-        # Campos opcionais - podem ser nulos
-        lancamentos_vyco['Data Emissão'] = None  # Campo não existe no V1, pode ser nulo
-        lancamentos_vyco['Valor Emissão'] = None  # Campo não existe no V1, pode ser nulo
-        lancamentos_vyco['Repetição'] = 0  # 0 = Única (padrão conforme especificação)
-        
-        # Campos com mapeamento direto
-        lancamentos_vyco['Total Parcelas'] = dados_lancamentos['Parcela'] if 'Parcela' in dados_lancamentos.columns else 1
-        lancamentos_vyco['Descrição'] = dados_lancamentos['Descricao'] if 'Descricao' in dados_lancamentos.columns else ''
-        lancamentos_vyco['Centro de Custo'] = dados_lancamentos['CentroDeCusto'] if 'CentroDeCusto' in dados_lancamentos.columns else None
-        lancamentos_vyco['Conta Corrente'] = dados_lancamentos['Conta'] if 'Conta' in dados_lancamentos.columns else None
-        lancamentos_vyco['Contato'] = dados_lancamentos['Contato'] if 'Contato' in dados_lancamentos.columns else None
+        lancamentos_vyco = pd.DataFrame({
+            # Campos obrigatórios - mapeamento direto
+            'Confirmado': dados_lancamentos['Confirmado'] if 'Confirmado' in colunas else 'Sim',
+            # Para Data, fazer cópia direta (datas originais são preservadas)
+            'Data': dados_lancamentos['Data'] if 'Data' in colunas else '',
+            'Valor': dados_lancamentos['Valor'] if 'Valor' in colunas else 0,
+            # Usar dados já com mapeamento aplicado
+            'Categoria': dados_lancamentos['Categoria'] if 'Categoria' in colunas else '',
+            
+            # Campos opcionais - podem ser nulos
+            'Data Emissão': None,  # Campo não existe no V1, pode ser nulo
+            'Valor Emissão': None,  # Campo não existe no V1, pode ser nulo
+            'Repetição': 0,  # 0 = Única (padrão conforme especificação)
+            
+            # Campos com mapeamento direto
+            'Total Parcelas': dados_lancamentos['Parcela'] if 'Parcela' in colunas else 1,
+            'Descrição': dados_lancamentos['Descricao'] if 'Descricao' in colunas else '',
+            'Centro de Custo': dados_lancamentos['CentroDeCusto'] if 'CentroDeCusto' in colunas else None,
+            'Conta Corrente': dados_lancamentos['Conta'] if 'Conta' in colunas else None,
+            'Contato': dados_lancamentos['Contato'] if 'Contato' in colunas else None
+        }, index=dados_lancamentos.index)
         
         # Garantir que campos obrigatórios não sejam nulos (mas preservar dados originais)
-        lancamentos_vyco['Confirmado'] = lancamentos_vyco['Confirmado'].fillna('Sim')
         # IMPORTANTE: Preservar datas originais - não alterar dados do usuário
         # Se a data original estava vazia, deve continuar vazia
-        lancamentos_vyco['Valor'] = lancamentos_vyco['Valor'].fillna(0)
-        lancamentos_vyco['Categoria'] = lancamentos_vyco['Categoria'].fillna('')
+        lancamentos_vyco = lancamentos_vyco.fillna({'Confirmado': 'Sim', 'Valor': 0, 'Categoria': ''})
         
         return lancamentos_vyco
     
@@ -374,31 +479,31 @@ class ProcessadorDados:
         if dados_transferencias.empty:
             return pd.DataFrame(columns=['Data', 'Valor', 'Descrição', 'Conta Débito', 'Conta Crédito'])
         
-        transferencias_vyco = dados_transferencias.copy()
+        # Cópia rasa: as colunas são sempre substituídas inteiras, nunca
+        # alteradas no lugar, então os dados de entrada ficam intactos
+        transferencias_vyco = dados_transferencias.copy(deep=False)
         
         # Processar coluna Movimentação para extrair Conta Débito e Conta Crédito
         if 'Movimentação' in transferencias_vyco.columns:
-            contas_debito = []
-            contas_credito = []
+            # Cada movimentação distinta é separada uma vez só (as transferências
+            # se repetem entre poucas contas); o resultado volta por posição
+            codigos, movimentacoes = pd.factorize(transferencias_vyco['Movimentação'])
             
-            for movimentacao in transferencias_vyco['Movimentação']:
-                if pd.isna(movimentacao) or ' para ' not in str(movimentacao):
-                    contas_debito.append('')
-                    contas_credito.append('')
-                else:
-                    partes = str(movimentacao).split(' para ', 1)
-                    if len(partes) == 2:
-                        contas_debito.append(partes[0].strip())
-                        contas_credito.append(partes[1].strip())
-                    else:
-                        contas_debito.append('')
-                        contas_credito.append('')
+            # Posição extra no fim, vazia: o código -1 (nulo) cai nela
+            contas_debito = np.full(len(movimentacoes) + 1, '', dtype=object)
+            contas_credito = np.full(len(movimentacoes) + 1, '', dtype=object)
             
-            transferencias_vyco['Conta Débito'] = contas_debito
-            transferencias_vyco['Conta Crédito'] = contas_credito
+            for posicao, movimentacao in enumerate(movimentacoes):
+                movimentacao = str(movimentacao)
+                if ' para ' in movimentacao:
+                    conta_debito, _, conta_credito = movimentacao.partition(' para ')
+                    contas_debito[posicao] = conta_debito.strip()
+                    contas_credito[posicao] = conta_credito.strip()
             
-            # Remover coluna original
-            transferencias_vyco = transferencias_vyco.drop('Movimentação', axis=1)
+            transferencias_vyco['Conta Débito'] = contas_debito[codigos]
+            transferencias_vyco['Conta Crédito'] = contas_credito[codigos]
+            
+            # A coluna original sai na seleção final das colunas obrigatórias
         
         # Garantir que temos todas as colunas obrigatórias
         colunas_obrigatorias = ['Data', 'Valor', 'Descrição', 'Conta Débito', 'Conta Crédito']
@@ -433,7 +538,32 @@ class ProcessadorDados:
             estatisticas[nome_planilha] = {
                 'total_registros': len(dados),
                 'colunas': list(dados.columns),
-                'registros_vazios': dados.isnull().sum().to_dict()
+                'registros_vazios': self._contar_vazios(dados)
             }
         
-        return estatisticas
\ No newline at end of file
+        return estatisticas
+    
+    def _contar_vazios(self, dados: pd.DataFrame) -> Dict[str, int]:
+        """
+        Conta os valores vazios de cada coluna sem montar um DataFrame booleano
+        
+        Colunas em Arrow já guardam a contagem de nulos no próprio array; as
+        demais usam count(), que conta os preenchidos coluna a coluna.
+        
+        Args:
+            dados: DataFrame processado
+            
+        Returns:
+            Dict[str, int]: Quantidade de valores vazios por coluna
+        """
+        total_registros = len(dados)
+        vazios = {}
+        
+        for coluna, serie in dados.items():
+            tipo = serie.dtype
+            if isinstance(tipo, pd.ArrowDtype) or (isinstance(tipo, pd.StringDtype) and tipo.storage == 'pyarrow'):
+                vazios[coluna] = pa.array(serie.array).null_count
+            else:
+                vazios[coluna] = total_registros - serie.count()
+        
+        return vazios
\ No newline at end of file
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Os módulos são importados como no app (modulos.*, utils) a partir da raiz
+if RAIZ_PROJETO not in sys.path:
+    sys.path.insert(0, RAIZ_PROJETO)
+
+
+@pytest.fixture(autouse=True)
+def diretorio_projeto(monkeypatch):
+    """O GeradorExcel procura modelos_vyco relativo ao diretório atual"""
+    monkeypatch.chdir(RAIZ_PROJETO)
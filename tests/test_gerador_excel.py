@@ -0,0 +1,72 @@
+"""
+Regressão do GeradorExcel contra as planilhas do baseline
+
+As planilhas em tests/dados/esperado foram geradas pela versão anterior às
+otimizações (commit 92eb488), com os modelos de modelos_v1 e o mesmo
+mapeamento usado aqui. O conteúdo lido de volta tem que ser idêntico.
+"""
+import io
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+
+from modulos.gerador_excel import GeradorExcel
+from modulos.manipulador_arquivos import ManipuladorArquivos
+from modulos.mapeador_categorias import MapeadorCategorias
+from modulos.processador_dados import ProcessadorDados
+
+DIRETORIO_ESPERADO = os.path.join(os.path.dirname(__file__), 'dados', 'esperado')
+
+
+@pytest.fixture(scope='module')
+def dados_processados():
+    """Processa os modelos de modelos_v1 como o app faz"""
+    manipulador = ManipuladorArquivos()
+    lancamentos = manipulador.ler_excel(os.path.join('modelos_v1', 'RelatorioDetalhado.xlsx'))
+    transferencias = manipulador.ler_excel(os.path.join('modelos_v1', 'Transferencias.xlsx'))
+    categorias = manipulador.ler_excel(os.path.join('modelos_v1', 'Categorias.xlsx'))
+    
+    # Toda categoria inconsistente vai para a primeira categoria válida
+    mapeador = MapeadorCategorias()
+    inconsistentes = mapeador.encontrar_categorias_inconsistentes(lancamentos, categorias, 'Categoria', 'Nome')
+    validas = mapeador.obter_categorias_validas(categorias, 'Nome')
+    mapeamento = {categoria: validas[0] for categoria in inconsistentes}
+    
+    return ProcessadorDados().processar_todos_os_dados(lancamentos, transferencias, categorias, mapeamento)
+
+
+def _ler_planilha(conteudo: bytes) -> pd.DataFrame:
+    return pd.read_excel(io.BytesIO(conteudo), engine='openpyxl')
+
+
+def _ler_esperado(nome_arquivo: str) -> pd.DataFrame:
+    return pd.read_excel(os.path.join(DIRETORIO_ESPERADO, nome_arquivo), engine='openpyxl')
+
+
+def test_planilhas_memoria_iguais_ao_baseline(dados_processados):
+    arquivos_memoria = GeradorExcel().gerar_planilhas_memoria(dados_processados)
+    
+    assert sorted(arquivos_memoria) == sorted(os.listdir(DIRETORIO_ESPERADO))
+    for nome_arquivo, conteudo in arquivos_memoria.items():
+        pd.testing.assert_frame_equal(_ler_planilha(conteudo), _ler_esperado(nome_arquivo))
+
+
+def test_zip_memoria_igual_ao_baseline(dados_processados):
+    gerador = GeradorExcel()
+    arquivos_memoria, conteudo_zip = gerador.gerar_zip_memoria(dados_processados)
+    
+    # Ordem do mapeamento, não a de término das threads
+    assert list(arquivos_memoria) == [
+        nome_arquivo for tipo_dado, nome_arquivo in GeradorExcel.MAPEAMENTO_ARQUIVOS.items()
+        if tipo_dado in dados_processados
+    ]
+    assert gerador.avisos == []
+    
+    with zipfile.ZipFile(io.BytesIO(conteudo_zip)) as arquivo_zip:
+        assert sorted(arquivo_zip.namelist()) == sorted(arquivos_memoria)
+        for nome_arquivo in arquivo_zip.namelist():
+            conteudo = arquivo_zip.read(nome_arquivo)
+            assert conteudo == arquivos_memoria[nome_arquivo]
+            pd.testing.assert_frame_equal(_ler_planilha(conteudo), _ler_esperado(nome_arquivo))
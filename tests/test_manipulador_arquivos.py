@@ -0,0 +1,86 @@
+"""
+Leitura das planilhas: calamine e os fallbacks para o openpyxl
+"""
+import io
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+
+from modulos.manipulador_arquivos import ManipuladorArquivos
+
+MODELOS_V1 = ['RelatorioDetalhado.xlsx', 'Transferencias.xlsx', 'Categorias.xlsx']
+
+
+def _sem_calamine(monkeypatch):
+    """Simula o python-calamine ausente: o read_excel com engine calamine falha no import"""
+    read_excel_original = pd.read_excel
+    chamadas = []
+    
+    def read_excel(arquivo, *args, **kwargs):
+        chamadas.append(kwargs.get('engine'))
+        if kwargs.get('engine') == 'calamine':
+            # O calamine pode ter consumido o buffer antes de falhar
+            if hasattr(arquivo, 'read'):
+                arquivo.read()
+            raise ImportError("Missing optional dependency 'python-calamine'")
+        return read_excel_original(arquivo, *args, **kwargs)
+    
+    monkeypatch.setattr(pd, 'read_excel', read_excel)
+    return chamadas
+
+
+def _ler_bytes(nome_arquivo: str) -> io.BytesIO:
+    with open(os.path.join('modelos_v1', nome_arquivo), 'rb') as arquivo:
+        return io.BytesIO(arquivo.read())
+
+
+@pytest.mark.parametrize('nome_arquivo', MODELOS_V1)
+def test_calamine_igual_ao_openpyxl(nome_arquivo):
+    dados = ManipuladorArquivos()._ler_planilha(_ler_bytes(nome_arquivo))
+    esperado = pd.read_excel(_ler_bytes(nome_arquivo), engine='openpyxl')
+    
+    pd.testing.assert_frame_equal(dados, esperado)
+
+
+@pytest.mark.parametrize('nome_arquivo', MODELOS_V1)
+def test_sem_calamine_usa_openpyxl_somente_leitura(monkeypatch, nome_arquivo):
+    esperado = pd.read_excel(_ler_bytes(nome_arquivo), engine='openpyxl')
+    chamadas = _sem_calamine(monkeypatch)
+    
+    dados = ManipuladorArquivos()._ler_planilha(_ler_bytes(nome_arquivo))
+    
+    # O openpyxl em modo somente leitura não passa pelo read_excel
+    assert chamadas == ['calamine']
+    pd.testing.assert_frame_equal(dados, esperado)
+
+
+def test_sem_calamine_aceita_caminho(monkeypatch):
+    caminho = os.path.join('modelos_v1', 'Categorias.xlsx')
+    esperado = pd.read_excel(caminho, engine='openpyxl')
+    _sem_calamine(monkeypatch)
+    
+    pd.testing.assert_frame_equal(ManipuladorArquivos()._ler_planilha(caminho), esperado)
+
+
+@pytest.mark.parametrize('erro', [zipfile.BadZipFile, ValueError])
+def test_arquivo_nao_xlsx_cai_no_read_excel_padrao(monkeypatch, erro):
+    chamadas = _sem_calamine(monkeypatch)
+    manipulador = ManipuladorArquivos()
+    
+    def falhar(arquivo):
+        arquivo.read()
+        raise erro("não é um arquivo xlsx")
+    
+    monkeypatch.setattr(manipulador, '_ler_planilha_somente_leitura', falhar)
+    
+    if erro is zipfile.BadZipFile:
+        # Ex.: .xls, que o openpyxl não abre; o read_excel escolhe o engine
+        dados = manipulador._ler_planilha(_ler_bytes('Categorias.xlsx'))
+        assert chamadas == ['calamine', None]
+        pd.testing.assert_frame_equal(dados, pd.read_excel(_ler_bytes('Categorias.xlsx')))
+    else:
+        # Outros erros não são engolidos pelo fallback
+        with pytest.raises(ValueError):
+            manipulador._ler_planilha(_ler_bytes('Categorias.xlsx'))
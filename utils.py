@@ -3,15 +3,37 @@ Utilitários auxiliares para o Conversor V1 para Vyco
 """
 
 import pandas as pd
+import numpy as np
 import logging
+import re
 from datetime import datetime
 import os
 from typing import List, Dict, Any, Optional
 
+# Caracteres descartados na conversão de texto para número
+_RE_NUM = re.compile(r'[^\d,.-]')
+
+# Formatos de data aceitos, na ordem de tentativa, com o separador que cada
+# um exige (textos sem esse separador nunca casam com o formato)
+_FORMATOS_DATA = (
+    ('%d/%m/%Y', '/'),
+    ('%d-%m-%Y', '-'),
+    ('%Y-%m-%d', '-'),
+    ('%d/%m/%y', '/'),
+    ('%d-%m-%y', '-')
+)
+
+# Linhas separadoras do relatório de conversão
+_SEPARADOR_RELATORIO = "=" * 50 + "\n"
+_SEPARADOR_SECAO = "-" * 25 + "\n"
+
 def configurar_logging():
     """Configura o sistema de logging"""
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
+    # Já configurado: não recriar handlers nem reabrir o arquivo de log
+    if logging.getLogger().handlers:
+        return logging.getLogger(__name__)
+    
+    os.makedirs('logs', exist_ok=True)
     
     log_filename = f"logs/conversor_{datetime.now().strftime('%Y%m%d')}.log"
     
@@ -19,13 +41,24 @@ def configurar_logging():
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         handlers=[
-            logging.FileHandler(log_filename, encoding='utf-8'),
+            # delay=True: o arquivo só é aberto na primeira mensagem
+            logging.FileHandler(log_filename, encoding='utf-8', delay=True),
             logging.StreamHandler()
         ]
     )
     
     return logging.getLogger(__name__)
 
+def _diretorios_existentes() -> set:
+    """
+    Lista, numa única leitura, os diretórios presentes no diretório atual
+    
+    Returns:
+        set: Nomes dos diretórios existentes
+    """
+    with os.scandir('.') as entradas:
+        return {entrada.name for entrada in entradas if entrada.is_dir()}
+
 def validar_estrutura_diretorios() -> bool:
     """
     Valida se a estrutura de diretórios necessária existe
@@ -39,11 +72,9 @@ def validar_estrutura_diretorios() -> bool:
         'preenchimento_vyco'
     ]
     
-    diretorios_faltantes = []
-    
-    for diretorio in diretorios_necessarios:
-        if not os.path.exists(diretorio):
-            diretorios_faltantes.append(diretorio)
+    # Uma única leitura do diretório atual em vez de um stat por diretório
+    existentes = _diretorios_existentes()
+    diretorios_faltantes = [diretorio for diretorio in diretorios_necessarios if diretorio not in existentes]
     
     if diretorios_faltantes:
         print(f"❌ Diretórios faltantes: {', '.join(diretorios_faltantes)}")
@@ -61,8 +92,12 @@ def criar_estrutura_diretorios():
         'logs'
     ]
     
+    existentes = _diretorios_existentes()
+    
     for diretorio in diretorios:
-        os.makedirs(diretorio, exist_ok=True)
+        # Só cria os que ainda não existem
+        if diretorio not in existentes:
+            os.makedirs(diretorio, exist_ok=True)
         print(f"✅ Diretório criado/verificado: {diretorio}")
 
 def limpar_texto(texto: str) -> str:
@@ -78,14 +113,9 @@ def limpar_texto(texto: str) -> str:
     if not isinstance(texto, str):
         return str(texto) if texto is not None else ""
     
-    # Remover espaços extras
-    texto = texto.strip()
-    
-    # Normalizar espaços
-    import re
-    texto = re.sub(r'\s+', ' ', texto)
-    
-    return texto
+    # Remover espaços extras e normalizar espaços (split sem argumento separa
+    # pelos mesmos espaços Unicode que \s, sem passar por regex)
+    return ' '.join(texto.split())
 
 def converter_para_float(valor: Any) -> float:
     """
@@ -97,16 +127,19 @@ def converter_para_float(valor: Any) -> float:
     Returns:
         float: Valor convertido ou 0.0 se não for possível
     """
-    if pd.isna(valor) or valor is None:
-        return 0.0
-    
-    if isinstance(valor, (int, float)):
+    # Atalhos para números, inclusive escalares numpy, sem passar pelo pd.isna
+    tipo = type(valor)
+    if tipo is float or isinstance(valor, np.floating):
+        return float(valor) if valor == valor else 0.0  # NaN é diferente de si mesmo
+    if tipo is int or isinstance(valor, np.integer):
         return float(valor)
     
+    if valor is None:
+        return 0.0
+    
     if isinstance(valor, str):
         # Remover caracteres não numéricos exceto vírgula, ponto e sinal
-        import re
-        valor_limpo = re.sub(r'[^\d,.-]', '', valor)
+        valor_limpo = _RE_NUM.sub('', valor)
         
         # Substituir vírgula por ponto
         valor_limpo = valor_limpo.replace(',', '.')
@@ -116,6 +149,10 @@ def converter_para_float(valor: Any) -> float:
         except ValueError:
             return 0.0
     
+    # Subclasses de int/float (ex: bool); nulos como pd.NA e pd.NaT caem no 0.0
+    if isinstance(valor, (int, float)):
+        return float(valor) if valor == valor else 0.0
+    
     return 0.0
 
 def converter_para_data(valor: Any) -> Optional[datetime]:
@@ -128,26 +165,26 @@ def converter_para_data(valor: Any) -> Optional[datetime]:
     Returns:
         datetime: Data convertida ou None se não for possível
     """
-    if pd.isna(valor) or valor is None:
+    # Textos e datas numpy primeiro, sem verificações genéricas de nulo
+    if isinstance(valor, str):
+        # Só tenta os formatos cujo separador aparece no texto, evitando a
+        # exceção do strptime nos que não têm como casar
+        for formato, separador in _FORMATOS_DATA:
+            if separador in valor:
+                try:
+                    return datetime.strptime(valor, formato)
+                except ValueError:
+                    continue
+        
         return None
     
-    if isinstance(valor, datetime):
-        return valor
+    if isinstance(valor, np.datetime64):
+        data = None if np.isnat(valor) else valor.astype('datetime64[us]').item()
+        return data if isinstance(data, datetime) else None
     
-    if isinstance(valor, str):
-        formatos_data = [
-            '%d/%m/%Y',
-            '%d-%m-%Y',
-            '%Y-%m-%d',
-            '%d/%m/%y',
-            '%d-%m-%y'
-        ]
-        
-        for formato in formatos_data:
-            try:
-                return datetime.strptime(valor, formato)
-            except ValueError:
-                continue
+    # pd.NaT também é datetime; demais tipos (nulos, números, date) não convertem
+    if isinstance(valor, datetime):
+        return None if valor is pd.NaT else valor
     
     return None
 
@@ -162,16 +199,13 @@ def obter_colunas_similares(df: pd.DataFrame, palavras_chave: List[str]) -> List
     Returns:
         List[str]: Lista de colunas encontradas
     """
-    colunas_encontradas = []
+    if not palavras_chave:
+        return []
     
-    for coluna in df.columns:
-        coluna_lower = coluna.lower()
-        for palavra in palavras_chave:
-            if palavra.lower() in coluna_lower:
-                colunas_encontradas.append(coluna)
-                break
+    # Uma única expressão com todas as palavras-chave: cada coluna é varrida uma vez
+    padrao = re.compile('|'.join(re.escape(palavra.lower()) for palavra in palavras_chave))
     
-    return colunas_encontradas
+    return [coluna for coluna in df.columns if padrao.search(coluna.lower())]
 
 def gerar_backup_dados(dados: Dict[str, pd.DataFrame], prefixo: str = "backup") -> str:
     """
@@ -189,7 +223,10 @@ def gerar_backup_dados(dados: Dict[str, pd.DataFrame], prefixo: str = "backup")
     caminho_backup = os.path.join('logs', nome_arquivo)
     
     try:
-        with pd.ExcelWriter(caminho_backup, engine='openpyxl') as writer:
+        # xlsxwriter só grava (não mantém o modelo de edição do openpyxl). O modo
+        # constant_memory não serve aqui: o pandas escreve coluna a coluna e esse
+        # modo descarta células fora da ordem das linhas
+        with pd.ExcelWriter(caminho_backup, engine='xlsxwriter') as writer:
             for nome_planilha, df in dados.items():
                 df.to_excel(writer, sheet_name=nome_planilha, index=False)
         
@@ -216,18 +253,19 @@ def validar_dados_obrigatorios(df: pd.DataFrame, colunas_obrigatorias: List[str]
         'avisos': []
     }
     
+    obrigatorias = pd.Index(colunas_obrigatorias)
+    
     # Verificar colunas faltantes
-    colunas_faltantes = set(colunas_obrigatorias) - set(df.columns)
-    if colunas_faltantes:
+    colunas_faltantes = obrigatorias.difference(df.columns)
+    if len(colunas_faltantes):
         resultado['valido'] = False
         resultado['erros'].append(f"Colunas obrigatórias faltantes: {', '.join(colunas_faltantes)}")
     
-    # Verificar dados vazios em colunas obrigatórias
-    for coluna in colunas_obrigatorias:
-        if coluna in df.columns:
-            valores_vazios = df[coluna].isna().sum()
-            if valores_vazios > 0:
-                resultado['avisos'].append(f"Coluna '{coluna}' possui {valores_vazios} valores vazios")
+    # Verificar dados vazios em colunas obrigatórias (contagem de todas de uma vez)
+    colunas_presentes = obrigatorias.intersection(df.columns, sort=False)
+    valores_vazios = len(df) - df[colunas_presentes].count()
+    for coluna, quantidade in valores_vazios[valores_vazios > 0].items():
+        resultado['avisos'].append(f"Coluna '{coluna}' possui {quantidade} valores vazios")
     
     return resultado
 
@@ -241,13 +279,17 @@ def obter_estatisticas_dataframe(df: pd.DataFrame) -> Dict[str, Any]:
     Returns:
         Dict: Estatísticas do DataFrame
     """
+    total_linhas = len(df)
+    
+    # count() e nunique() percorrem cada coluna uma vez, sem montar um
+    # DataFrame booleano de nulos nem um Series por coluna
     return {
-        'total_linhas': len(df),
+        'total_linhas': total_linhas,
         'total_colunas': len(df.columns),
         'colunas': list(df.columns),
         'tipos_dados': df.dtypes.to_dict(),
-        'valores_nulos': df.isnull().sum().to_dict(),
-        'valores_unicos': {col: df[col].nunique() for col in df.columns},
+        'valores_nulos': (total_linhas - df.count()).to_dict(),
+        'valores_unicos': df.nunique().to_dict(),
         'memoria_usada': df.memory_usage(deep=True).sum(),
         'linhas_duplicadas': df.duplicated().sum()
     }
@@ -271,44 +313,47 @@ def exportar_relatorio_conversao(dados_originais: Dict[str, pd.DataFrame],
     caminho_relatorio = os.path.join('logs', nome_relatorio)
     
     try:
+        # Montar o relatório em memória, uma seção por vez, e gravar de uma vez
+        partes = [
+            f"{_SEPARADOR_RELATORIO}"
+            f"RELATÓRIO DE CONVERSÃO V1 PARA VYCO\n"
+            f"{_SEPARADOR_RELATORIO}\n"
+            f"Data/Hora: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n\n"
+        ]
+        
+        # Estatísticas dos dados originais e dos processados: só o tamanho e os
+        # nomes das colunas, sem as estatísticas completas de obter_estatisticas_dataframe
+        secoes = (
+            (f"DADOS ORIGINAIS (V1):\n{'-' * 20}\n", dados_originais),
+            (f"DADOS PROCESSADOS (VYCO):\n{_SEPARADOR_SECAO}", dados_processados),
+        )
+        for titulo, dados in secoes:
+            partes.append(titulo)
+            partes.extend(
+                f"{nome.upper()}:\n"
+                f"  - Linhas: {len(df)}\n"
+                f"  - Colunas: {len(df.columns)}\n"
+                f"  - Colunas: {', '.join(df.columns)}\n\n"
+                for nome, df in dados.items()
+            )
+        
+        # Mapeamento de categorias
+        if mapeamento_categorias:
+            partes.append(f"MAPEAMENTO DE CATEGORIAS:\n{_SEPARADOR_SECAO}")
+            partes.extend(
+                f"  {categoria_antiga} → {categoria_nova}\n"
+                for categoria_antiga, categoria_nova in mapeamento_categorias.items()
+            )
+            partes.append(f"\nTotal de categorias mapeadas: {len(mapeamento_categorias)}\n\n")
+        
+        partes.append(
+            f"{_SEPARADOR_RELATORIO}"
+            f"CONVERSÃO CONCLUÍDA COM SUCESSO\n"
+            f"{_SEPARADOR_RELATORIO}"
+        )
+        
         with open(caminho_relatorio, 'w', encoding='utf-8') as arquivo:
-            arquivo.write("=" * 50 + "\n")
-            arquivo.write("RELATÓRIO DE CONVERSÃO V1 PARA VYCO\n")
-            arquivo.write("=" * 50 + "\n\n")
-            
-            arquivo.write(f"Data/Hora: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n\n")
-            
-            # Estatísticas dos dados originais
-            arquivo.write("DADOS ORIGINAIS (V1):\n")
-            arquivo.write("-" * 20 + "\n")
-            for nome, df in dados_originais.items():
-                stats = obter_estatisticas_dataframe(df)
-                arquivo.write(f"{nome.upper()}:\n")
-                arquivo.write(f"  - Linhas: {stats['total_linhas']}\n")
-                arquivo.write(f"  - Colunas: {stats['total_colunas']}\n")
-                arquivo.write(f"  - Colunas: {', '.join(stats['colunas'])}\n\n")
-            
-            # Estatísticas dos dados processados
-            arquivo.write("DADOS PROCESSADOS (VYCO):\n")
-            arquivo.write("-" * 25 + "\n")
-            for nome, df in dados_processados.items():
-                stats = obter_estatisticas_dataframe(df)
-                arquivo.write(f"{nome.upper()}:\n")
-                arquivo.write(f"  - Linhas: {stats['total_linhas']}\n")
-                arquivo.write(f"  - Colunas: {stats['total_colunas']}\n")
-                arquivo.write(f"  - Colunas: {', '.join(stats['colunas'])}\n\n")
-            
-            # Mapeamento de categorias
-            if mapeamento_categorias:
-                arquivo.write("MAPEAMENTO DE CATEGORIAS:\n")
-                arquivo.write("-" * 25 + "\n")
-                for categoria_antiga, categoria_nova in mapeamento_categorias.items():
-                    arquivo.write(f"  {categoria_antiga} → {categoria_nova}\n")
-                arquivo.write(f"\nTotal de categorias mapeadas: {len(mapeamento_categorias)}\n\n")
-            
-            arquivo.write("=" * 50 + "\n")
-            arquivo.write("CONVERSÃO CONCLUÍDA COM SUCESSO\n")
-            arquivo.write("=" * 50 + "\n")
+            arquivo.write(''.join(partes))
         
         return caminho_relatorio
         